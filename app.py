@@ -27,7 +27,14 @@ from flask_minify import Minify
 from flask_compress import Compress
 from flask import render_template, abort
 import secrets
+import tempfile
 from flask import send_from_directory
+from flask import jsonify
+from memory_cache import hot_cache
+from frame_codec import codec_stats
+from figure_cache import figure_stats
+from rate_limiter import limiter
+from symbol_index import symbol_index
 
 
 # Initialize the Dash app with a default Bootstrap theme
@@ -90,7 +97,16 @@ app.server.config['SESSION_TYPE'] = 'filesystem'
 app.server.config['SESSION_PERMANENT'] = True  # Make session permanent to last across sessions
 app.server.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=7)  # Customize session lifetime (e.g., 7 days)
 
-app.server.config['CACHE_TYPE'] = 'SimpleCache'  # You can also use 'RedisCache', 'FileSystemCache', etc.
+# Shared cache backend so every gunicorn worker sees the same entries:
+# REDIS_URL selects Redis, otherwise a filesystem cache shared by the workers on this host.
+# Set CACHE_TYPE=SimpleCache for a local in-process stand-in (e.g. in tests).
+if os.getenv('REDIS_URL'):
+    app.server.config['CACHE_TYPE'] = 'RedisCache'
+    app.server.config['CACHE_REDIS_URL'] = os.getenv('REDIS_URL')
+else:
+    app.server.config['CACHE_TYPE'] = os.getenv('CACHE_TYPE', 'FileSystemCache')
+    app.server.config['CACHE_DIR'] = os.getenv('CACHE_DIR', os.path.join(tempfile.gettempdir(), 'mystocks-cache'))
+    app.server.config['CACHE_THRESHOLD'] = 5000  # Max number of entries before pruning
 app.server.config['CACHE_DEFAULT_TIMEOUT'] = 600  # Cache timeout in seconds (10 minutes)
 
 # Initialize Cache object
@@ -302,6 +318,8 @@ def serve_dash_app(path):
 
 auth_callbacks.register_auth_callbacks(app, server, mail)
 data_callbacks.get_data_callbacks(app, server, cache)
+# Keep the autocomplete index current in the background
+symbol_index.start()
 
 
 @server.route('/check-session')
@@ -311,6 +329,15 @@ def check_session():
     return f"Logged In: {logged_in}, Username: {username}"
 
 
+@server.route('/cache-stats')
+def cache_stats():
+    # Hot tier occupancy and hit rates, serialized size and load time of price
+    # frames going through the shared tier, figure cache hits and upstream
+    # rate limiter waits
+    return jsonify({'hot_cache': hot_cache.stats(), 'frame_codec': codec_stats(),
+                    'figure_cache': figure_stats(), 'rate_limiter': limiter.stats()})
+
+
 @app.server.route('/confirm/<token>')
 def confirm_email(token):
     try:
@@ -1344,12 +1371,15 @@ def update_stock_suggestions(company_name):
         raise PreventUpdate
 
     try:
-        # Get a list of ticker suggestions (multiple tickers)
-        tickers = ut.get_ticker(company_name)
+        # Answer from the local symbol index; Yahoo search only on a miss
+        tickers = symbol_index.search(company_name)
+        if not tickers:
+            tickers = ut.get_ticker(company_name)
+            symbol_index.add(tickers)
         
         # Format the suggestions for dcc.Dropdown
         if tickers:
-            return [{'label': f"{ticker} ({company_name.title()})", 'value': ticker} for ticker in tickers]
+            return [{'label': f"{ticker} ({name})", 'value': ticker} for ticker, name in tickers]
         else:
             # No tickers found
             return [{'label': 'No matching stocks found', 'value': ''}]
@@ -1406,6 +1436,18 @@ app.clientside_callback(
 )
 
 
+# Screen class for the server-side chart pipeline (how many points a figure gets)
+app.clientside_callback(
+    """
+    function(pathname) {
+        return window.innerWidth < 768 ? 'mobile' : 'desktop';
+    }
+    """,
+    Output('device-type', 'data'),
+    Input('url', 'pathname')
+)
+
+
 app.index_string = '''
 <!DOCTYPE html>
 <html lang="en">
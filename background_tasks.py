@@ -2,13 +2,13 @@ from apscheduler.schedulers.background import BackgroundScheduler
 from datetime import datetime
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-import yfinance as yf
 import pandas as pd
 from dotenv import load_dotenv
 import os
-from yfinance.exceptions import YFException
 from sqlalchemy.exc import SQLAlchemyError
 import time
+import market_data as md
+from rate_limiter import set_default_priority
 
 # Load environment variables
 load_dotenv()
@@ -45,8 +45,7 @@ class StockKPI(db.Model):
 # Function to fetch KPI data
 def fetch_kpi_for_stock(symbol):
     try:
-        ticker = yf.Ticker(symbol)
-        info = ticker.info
+        info = md.get_ticker_info(symbol)
         if not info:
             print(f"No data found for {symbol}")
             return None
@@ -68,7 +67,7 @@ def fetch_kpi_for_stock(symbol):
 
         print(f"Fetched KPIs for {symbol}: {kpis}")
         return kpis
-    except YFException as e:
+    except Exception as e:  # Provider errors differ per backend; skip the symbol
         print(f"Failed to fetch data for {symbol}: {e}")
         return None
 
@@ -178,6 +177,8 @@ def update_stock_data():
 
 # Initialize and start the scheduler
 if __name__ == "__main__":
+    # The crawl only uses Yahoo budget the web workers leave unused
+    set_default_priority('batch')
     scheduler = BackgroundScheduler()
 
     # First-time update
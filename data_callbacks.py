@@ -1,8 +1,7 @@
 import dash
 import dash_bootstrap_components as dbc
-from dash import dcc, html
+from dash import dcc, html, Patch
 from dash.dependencies import Input, Output, State, ALL, MATCH
-import yfinance as yf
 import plotly.express as px
 import pandas as pd
 from datetime import datetime, timedelta
@@ -10,6 +9,15 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import json
 import utils as ut
+import market_data as md
+import market_hours as mh
+from price_store import store as price_store
+from quote_snapshot import snapshot as quote_snapshot
+from memory_cache import TieredCache, hot_cache, freeze_frame
+from figure_cache import FigureCache, frame_version
+from downsample import target_points
+import indicators as ind
+from rate_limiter import priority
 # Make sure to import the app instance
 from models import User, db, Watchlist, StockKPI
 from dash.exceptions import PreventUpdate
@@ -19,23 +27,129 @@ import asyncio
 
 def get_data_callbacks(app, server, cache):
 
+    # Byte-bounded per-worker hot tier in front of the shared cache backend
+    tiered_cache = TieredCache(hot_cache, cache)
+    # Built figures, shared by every user asking for the same view of the same data
+    figure_cache = FigureCache(tiered_cache)
+
+    # News keeps coming outside trading hours, so closed-market TTLs are capped
+    @tiered_cache.memoize(timeout=lambda: mh.market_ttl(600, closed_ttl=3600))
+    def fetch_news_with_cache(stock_symbols):
+        # Concurrent misses for the same symbols share a single fetch
+        return md.single_flight.do(('news_content', tuple(stock_symbols)), ut.fetch_news, stock_symbols)
+
+    @tiered_cache.memoize(timeout=lambda: mh.market_ttl(3600))
+    def fetch_analyst_reco_with_cache(symbol):
+        return md.single_flight.do(('recommendations', symbol), ut.fetch_analyst_recommendations, symbol)
+
+    def price_cache_key(symbol, interval):
+        return f"prices:{symbol}:{interval}"
+
+    def price_ttl(interval, symbols):
+        # While the circuit is open the data comes from the store; retry soon after.
+        # Data drawn from several symbols expires with the first of them
+        if md.breaker.degraded:
+            return 60
+        return min((mh.price_ttl(interval, symbol=symbol) for symbol in symbols), default=mh.price_ttl(interval))
+
+    def price_refresher(symbol, interval):
+        # Rebuilds a cached price entry over the same range; the store only
+        # fetches the bars it is missing
+        def refresh(entry):
+            # The range is part of the key: a caller may only share a fetch of the range it asked for
+            fetched = md.single_flight.do(
+                ('prices', interval, (symbol,), entry['start'], None),
+                price_store.get_histories, [symbol], entry['start'], None, interval
+            )
+            if symbol not in fetched:
+                return None
+            return {'start': entry['start'], 'data': freeze_frame(fetched[symbol])}
+        return refresh
+
+    def get_stocks_data_cached(symbols, start_date, end_date, interval):
+        # Each (symbol, interval) entry holds the widest range fetched so far,
+        # so any narrower range is answered by slicing it
+        frames, missing = {}, []
+        widest_start = pd.Timestamp(start_date)
+        if interval == '1d':
+            # Load the longest predefined range up front so switching ranges stays local
+            widest_start = min(widest_start, pd.Timestamp(end_date).normalize() - timedelta(days=3650))
+        for symbol in symbols:
+            entry = tiered_cache.get(price_cache_key(symbol, interval),
+                                     refresh=price_refresher(symbol, interval),
+                                     timeout=lambda: price_ttl(interval, [symbol]))
+            if entry is not None and entry['start'] <= pd.Timestamp(start_date):
+                # Zero-copy view over the frozen buffers, no unpickling on a hot hit
+                frames[symbol] = entry['data'].view(start_date, end_date)
+            else:
+                missing.append(symbol)
+                if entry is not None:
+                    widest_start = min(widest_start, entry['start'])
+
+        # Serve cache misses from the local price store, which fetches only missing bars
+        if missing:
+            fetched = md.single_flight.do(
+                ('prices', interval, tuple(missing), widest_start, None),
+                price_store.get_histories, missing, widest_start, None, interval
+            )
+            # Valid until the next bar can exist: the next bar boundary while the
+            # market is open, the next session open while it is closed
+            for symbol, df in fetched.items():
+                frozen = freeze_frame(df)
+                tiered_cache.set(price_cache_key(symbol, interval), {'start': widest_start, 'data': frozen},
+                                 timeout=price_ttl(interval, [symbol]))
+                frames[symbol] = frozen.view(start_date, end_date)
+
+        return frames
+
+    def get_stock_data_cached(symbol, start_date, end_date, interval):
+        return get_stocks_data_cached([symbol], start_date, end_date, interval).get(symbol, pd.DataFrame())
+
+    def get_indicators_cached(symbols, interval, specs, start_date, end_date):
+        # Indicators are computed over each symbol's whole cached series, so long
+        # windows are warmed up on short ranges too, and cached per series version.
+        # Call after get_stocks_data_cached, which fills the price entries.
+        results, pending = {}, {}
+        for symbol in symbols:
+            entry = tiered_cache.get(price_cache_key(symbol, interval))
+            if entry is None:
+                continue
+            series = entry['data'].view()
+            key = f"indicators:{symbol}:{interval}:{','.join(specs)}:{frame_version(series)}"
+            cached = tiered_cache.get(key)
+            if cached is not None:
+                results[symbol] = cached.view(start_date, end_date)
+            else:
+                pending[symbol] = (key, series)
+
+        if pending:
+            # All uncached symbols in one vectorized pass
+            computed = ind.compute_indicators({symbol: series for symbol, (_, series) in pending.items()}, specs)
+            for symbol, df in computed.items():
+                frozen = freeze_frame(df)
+                tiered_cache.set(pending[symbol][0], frozen, timeout=price_ttl(interval, [symbol]))
+                results[symbol] = frozen.view(start_date, end_date)
+        return results
+    
+
     async def preload_data_async(cache):
         try:
-            await asyncio.gather(
-                preload_prices_async(cache),
-                preload_news_async(cache)
-            )
+            # Startup warming must not compete with the first user requests
+            with priority('prefetch'):
+                await asyncio.gather(
+                    preload_prices_async(cache),
+                    preload_news_async(cache)
+                )
         except Exception as e:
             print(f"Error during preloading: {e}")
 
     async def preload_prices_async(cache):
         try:
             print("Preloading prices data asynchronously...")
-            prices_data = yf.download(['AAPL', 'MSFT'], pd.to_datetime(
-                'today') - timedelta(days=365), pd.to_datetime('today'), interval="1d")
-            if not prices_data.empty:
-                cache.set('prices_data', prices_data)
-            else:
+            # Warm the same per-symbol entries the prices page reads
+            today = pd.to_datetime('today')
+            prices_data = get_stocks_data_cached(['AAPL', 'MSFT'], today - timedelta(days=365), today, '1d')
+            if not prices_data:
                 print("Failed to preload prices data: empty DataFrame")
         except Exception as e:
             print(f"Error during price preload: {e}")
@@ -70,22 +184,9 @@ def get_data_callbacks(app, server, cache):
 
     print("Async preload completed.")
 
-    @cache.memoize(timeout=600)  # Cache the result for 10 minutes
-    def fetch_news_with_cache(stock_symbols):
-        # Your existing function to fetch the news
-        return ut.fetch_news(stock_symbols)
-
-    @cache.memoize(timeout=600)  # Cache the result for 10 minutes
-    def fetch_analyst_reco_with_cache(symbol):
-        # Your existing function to fetch the news
-        return ut.fetch_analyst_recommendations(symbol)
-
-    @cache.memoize(timeout=600)  # Cache for 15 minutes
-    def get_stock_data_cached(symbol, start_date, end_date, interval):
-        return yf.download(symbol, start=start_date, end=end_date, interval=interval)
-    
+    # Keep latest quotes for all watched symbols in memory
+    quote_snapshot.start(server, cache)
 
-    preloaded_prices = cache.get('prices_data')
     preloaded_news = cache.get('news_data')
 
     # --------------------------------------------------
@@ -119,7 +220,14 @@ def get_data_callbacks(app, server, cache):
             selected_news_stocks = individual_stocks[:5]
 
         # Fetch related news for the selected stocks
-        news_content = fetch_news_with_cache(selected_news_stocks)
+        try:
+            news_content = fetch_news_with_cache(selected_news_stocks)
+        except Exception as e:
+            print(f"News not available for {selected_news_stocks}: {e}")
+            news_content = [html.Div("News is temporarily unavailable. Please try again later.")]
+        note = ut.stale_data_note()
+        if note:
+            news_content = [html.P(note, className='text-warning small')] + list(news_content)
 
         return (
             news_content,
@@ -177,7 +285,8 @@ def get_data_callbacks(app, server, cache):
     @app.callback(
         [
             Output('individual-stocks-store', 'data'),
-            Output('stock-suggestions-input', 'value')
+            Output('stock-suggestions-input', 'value'),
+            Output('stock-input-message', 'children')
         ],
         [
             Input('saved-watchlists-dropdown', 'value'),
@@ -201,7 +310,7 @@ def get_data_callbacks(app, server, cache):
     
         # Ignore updates when the create button is clicked to prevent clearing the store
         if trigger_id == 'create-watchlist-button.n_clicks':
-            return individual_stocks, dash.no_update
+            return individual_stocks, dash.no_update, dash.no_update
     
         default_stocks = []  # Default to an empty list for a full reset
     
@@ -219,25 +328,30 @@ def get_data_callbacks(app, server, cache):
     
         elif 'stock-suggestions-input' in trigger_id and new_stock:
             new_stock = new_stock.upper().strip()
+            if md.is_unknown_symbol(new_stock):
+                print(f"Not adding unknown symbol: {new_stock}")
+                message = dbc.Alert(f"{new_stock} was not added: Yahoo Finance has no price history for it.",
+                                    color="warning", className="mt-2", dismissable=True)
+                return individual_stocks, '', message
             if new_stock and new_stock not in individual_stocks:
                 individual_stocks.append(new_stock)
             print(f"Added new stock: {new_stock}")
-            return individual_stocks, ''
+            return individual_stocks, '', None
     
         elif 'reset-stocks-button' in trigger_id:
             individual_stocks = []
             print("Stocks reset to empty list")
-            return individual_stocks, dash.no_update
+            return individual_stocks, dash.no_update, dash.no_update
     
         elif 'remove-stock' in trigger_id:
             index_to_remove = json.loads(trigger_id.split('.')[0])['index']
             if 0 <= index_to_remove < len(individual_stocks):
                 removed_stock = individual_stocks.pop(index_to_remove)
                 print(f"Removed stock at index {index_to_remove}: {removed_stock}")
-            return individual_stocks, dash.no_update
+            return individual_stocks, dash.no_update, dash.no_update
     
         print(f"Updated individual_stocks: {individual_stocks}")
-        return individual_stocks, dash.no_update
+        return individual_stocks, dash.no_update, dash.no_update
 
 
     
@@ -420,69 +534,95 @@ def get_data_callbacks(app, server, cache):
             Input('url', 'pathname'),
             Input('chart-type', 'value'),
             Input('movag_input', 'value'),
+            Input('indicator-input', 'value'),
             Input('predefined-ranges', 'value'),
-            Input('plotly-theme-store', 'data'),
             Input('individual-stocks-store', 'data'),
             Input('prices-stock-dropdown', 'value')
         ],
-        [State('prices-fig-store', 'data')],
+        [State('prices-fig-store', 'data'), State('plotly-theme-store', 'data'), State('device-type', 'data')],
         prevent_initial_call=True
     )
     def update_stock_graph_and_dropdown(
-        pathname, chart_type, movag_input, predefined_range, plotly_theme,
-        individual_stocks, selected_prices_stocks, stored_data
+        pathname, chart_type, movag_input, indicator_text, predefined_range,
+        individual_stocks, selected_prices_stocks, stored_data, plotly_theme, device_type
     ):
         if pathname != '/prices':
             raise PreventUpdate
     
         options = [{'label': stock, 'value': stock} for stock in individual_stocks]
         selected_prices_stocks = selected_prices_stocks or individual_stocks[-10:]
+        view = {
+            'stocks': selected_prices_stocks,
+            'chart_type': chart_type,
+            'movag_input': movag_input,
+            'indicator_text': indicator_text,
+            'predefined_range': predefined_range,
+            'plotly_theme': plotly_theme,
+            'device_type': device_type
+        }
+
+        # Coming back to the page with an unchanged view: rehydrate the figure
+        # from the server-side figure cache without touching the price data
+        if dash.callback_context.triggered_id == 'url' and stored_data and stored_data.get('view') == view:
+            cached = figure_cache.get(stored_data['figure_key'])
+            if cached is not None:
+                fig_stock, graph_height = cached
+                return fig_stock, {'height': f'{graph_height}px'}, options, selected_prices_stocks, stored_data
     
         today = pd.to_datetime('today')
         start_date, interval = determine_date_range(predefined_range, today)
-        data_frames = []
+        data_frames = {}
+        frames = get_stocks_data_cached(selected_prices_stocks, start_date, today, interval)
+        versions = tuple((stock, frame_version(frames.get(stock))) for stock in selected_prices_stocks)
+        specs = ind.indicator_specs(list(movag_input or []) + ind.specs_from_text(indicator_text))
+        indicator_frames = get_indicators_cached(selected_prices_stocks, interval, specs, start_date, today) if specs else {}
     
         for stock in selected_prices_stocks:
             try:
-                df = get_stock_data_cached(stock, start_date, today, interval)
-                if df.empty:
+                df = frames.get(stock)
+                if df is None or df.empty:
+                    print(f"Data for {stock} not available")
                     continue
     
-                df.index = pd.to_datetime(df.index)  # Ensure index is datetime
-                df['Date'] = df.index  # Add a 'Date' column for plotting consistency
-    
-                if '30D_MA' in movag_input:
-                    df['30D_MA'] = df['Close'].rolling(window=30).mean()
-                if '100D_MA' in movag_input:
-                    df['100D_MA'] = df['Close'].rolling(window=100).mean()
-                df['Stock'] = stock
-                data_frames.append(df)
+                # Cached frames are read-only views; indicators are joined as new columns
+                if stock in indicator_frames:
+                    df = df.join(indicator_frames[stock])
+                data_frames[stock] = df
             except Exception as e:
                 print(f"Data for {stock} not available: {e}")
                 continue
     
-        df_all = pd.concat(data_frames, ignore_index=False) if data_frames else pd.DataFrame()
-    
-        if df_all.empty:
+        if not data_frames:
             fig_store_data = {}
             empty_fig = {
                 'data': [],
-                'layout': {'title': 'No Data Available for Selected Stocks'}
+                'layout': {'title': (ut.unknown_symbols_note(selected_prices_stocks) or ut.stale_data_note()
+                                     or 'No Data Available for Selected Stocks')}
             }
             return empty_fig, {'height': '400px'}, options, selected_prices_stocks, fig_store_data
     
-        fig_stock, graph_height = ut.generate_fig_stock(df_all, selected_prices_stocks, movag_input, chart_type, plotly_theme, interval)
-    
+        as_of = max(df.index[-1] for df in data_frames.values())
+        max_points = target_points(device_type)
+
+        def build_fig_stock():
+            fig, height = ut.generate_fig_stock(data_frames, selected_prices_stocks, movag_input, chart_type, plotly_theme,
+                                                interval, max_points=max_points, indicators=specs)
+            ut.mark_figure_stale(fig, as_of)
+            ut.mark_unknown_symbols(fig, selected_prices_stocks)
+            return fig, height
+
+        # The notes are part of the key so annotations appear and clear with the upstream state
+        figure_inputs = (tuple(selected_prices_stocks), interval, chart_type, 'Volume' in (movag_input or ()), specs,
+                         plotly_theme, max_points, versions,
+                         ut.stale_data_note(as_of), ut.unknown_symbols_note(selected_prices_stocks))
+        fig_stock, graph_height = figure_cache.get_or_build('prices', figure_inputs, build_fig_stock,
+                                                             price_ttl(interval, selected_prices_stocks))
+    
+        # A handle to the server-side figure, not the figure or its data: the
+        # session store stays a few hundred bytes whatever the chart size
         fig_store_data = {
-            'figure': fig_stock,
-            'data': df_all.to_dict('records'),
-            'options': options,
-            'individual_stocks': individual_stocks,
-            'chart_type': chart_type,
-            'movag_input': movag_input,
-            'predefined_range': predefined_range,
-            'plotly_theme': plotly_theme,
-            'graph_height': graph_height
+            'figure_key': figure_cache.key('prices', figure_inputs),
+            'view': view
         }
     
         return fig_stock, {'height': f'{graph_height}px'}, options, selected_prices_stocks, fig_store_data
@@ -515,22 +655,42 @@ def get_data_callbacks(app, server, cache):
         start_date, interval = determine_date_range(predefined_range, today)
         end_date = today
     
-        indexed_data = {}
-        for symbol in selected_comparison_stocks:
-            # Retry logic for cache miss or API failures
-            try:
-                df_stock = get_stock_data_cached(symbol, start_date, end_date, interval)
-                if not df_stock.empty:
-                    df_stock['Index'] = df_stock['Close'] / df_stock['Close'].iloc[0] * 100
-                    indexed_data[symbol] = df_stock[['Index']].rename(columns={"Index": symbol})
-            except KeyError as e:
-                print(f"Data for {symbol} not available: {e}")
-                continue
+        try:
+            frames = get_stocks_data_cached(selected_comparison_stocks, start_date, end_date, interval)
+        except Exception as e:
+            print(f"Comparison data not available for {selected_comparison_stocks}: {e}")
+            frames = {}
     
         # Check and process benchmark data
         benchmark_data = process_benchmark_data(benchmark_selection, start_date, end_date, interval)
-    
-        fig_indexed = generate_indexed_graph(indexed_data, benchmark_data, plotly_theme, selected_comparison_stocks)
+        as_of = max((df.index[-1] for df in frames.values() if not df.empty), default=None)
+
+        def build_fig_indexed():
+            indexed_data = {}
+            for symbol in selected_comparison_stocks:
+                try:
+                    df_stock = frames.get(symbol, pd.DataFrame())
+                    if not df_stock.empty:
+                        indexed = df_stock['Close'] / df_stock['Close'].iloc[0] * 100
+                        indexed_data[symbol] = indexed.to_frame(name=symbol)
+                except Exception as e:
+                    print(f"Data for {symbol} not available: {e}")
+                    continue
+
+            fig = generate_indexed_graph(indexed_data, benchmark_data, plotly_theme, selected_comparison_stocks)
+            ut.mark_figure_stale(fig, as_of)
+            ut.mark_unknown_symbols(fig, selected_comparison_stocks)
+            return fig, None
+
+        figure_inputs = (tuple(selected_comparison_stocks), interval, benchmark_selection, plotly_theme,
+                         tuple((symbol, frame_version(frames.get(symbol))) for symbol in selected_comparison_stocks),
+                         frame_version(benchmark_data), ut.stale_data_note(as_of),
+                         ut.unknown_symbols_note(selected_comparison_stocks))
+        drawn_symbols = list(selected_comparison_stocks)
+        if benchmark_selection and benchmark_selection != 'None':
+            drawn_symbols.append(benchmark_selection)
+        fig_indexed, _ = figure_cache.get_or_build('indexed', figure_inputs, build_fig_indexed,
+                                                    price_ttl(interval, drawn_symbols))
     
         return fig_indexed, options, selected_comparison_stocks
     
@@ -565,7 +725,7 @@ def get_data_callbacks(app, server, cache):
                 if not benchmark_data.empty:
                     benchmark_data['Index'] = benchmark_data['Close'] / benchmark_data['Close'].iloc[0] * 100
                 return benchmark_data
-            except KeyError as e:
+            except Exception as e:
                 print(f"Benchmark data for {benchmark_selection} not available: {e}")
         return None
     
@@ -623,6 +783,30 @@ def get_data_callbacks(app, server, cache):
         return fig_indexed
 
 
+    # Theme switches only swap the template of figures already in the browser;
+    # no data is fetched and no figure is rebuilt
+    def theme_patch(plotly_theme):
+        patch = Patch()
+        patch['layout']['template'] = ut.plotly_template(plotly_theme)
+        return patch
+
+    for graph_id in ('stock-graph', 'indexed-comparison-graph', 'forecast-graph'):
+        app.callback(
+            Output(graph_id, 'figure', allow_duplicate=True),
+            Input('plotly-theme-store', 'data'),
+            prevent_initial_call=True
+        )(theme_patch)
+
+    @app.callback(
+        Output({'type': 'recommendations-graph', 'index': ALL}, 'figure'),
+        Input('plotly-theme-store', 'data'),
+        State({'type': 'recommendations-graph', 'index': ALL}, 'id'),
+        prevent_initial_call=True
+    )
+    def apply_recommendations_theme(plotly_theme, graph_ids):
+        return [theme_patch(plotly_theme) for _ in graph_ids]
+
+
 
     @app.callback(
         Output('top-stocks-table', 'children'),
@@ -766,12 +950,17 @@ def get_data_callbacks(app, server, cache):
         ],
         [Input('url', 'pathname')],
         [Input('forecast-data-store', 'data')],
+        [State('plotly-theme-store', 'data')],
         # prevent_initial_call=True
     )
-    def display_stored_forecast(pathname, stored_forecast):
+    def display_stored_forecast(pathname, stored_forecast, plotly_theme):
         # Display stored forecast only when navigating back to /forecast
         if pathname == '/forecast' and stored_forecast:
-            return stored_forecast.get('figure'), stored_forecast.get('kpi_outputs')
+            figure = stored_forecast.get('figure')
+            if figure and plotly_theme:
+                # The theme may have changed since the forecast was stored
+                figure.setdefault('layout', {})['template'] = ut.plotly_template(plotly_theme)
+            return figure, stored_forecast.get('kpi_outputs')
         return no_update, no_update
     
     
@@ -786,8 +975,8 @@ def get_data_callbacks(app, server, cache):
         if n_clicks and stock_symbol and investment_amount and investment_date:
             investment_date = pd.to_datetime(investment_date)
             end_date = pd.to_datetime('today')
-            data = yf.download(
-                stock_symbol, start=investment_date, end=end_date)
+            with priority('premium'):
+                data = price_store.get_history(stock_symbol, investment_date, end_date)
 
             if not data.empty:
                 initial_price = data['Close'].iloc[0]
@@ -820,7 +1009,9 @@ def get_data_callbacks(app, server, cache):
                     dragmode=False
                 )
 
+                note = ut.stale_data_note(data.index[-1])
                 return html.Div([
+                    html.P(note, className='text-warning small mb-2') if note else None,
                     html.P(
                         f"Initial Investment Amount: ${investment_amount:.2f}", className='mb-2'),
                     html.P(
@@ -833,7 +1024,8 @@ def get_data_callbacks(app, server, cache):
             else:
                 return html.Div([
                     html.P(
-                        f"No data available for {stock_symbol} from {investment_date.strftime('%Y-%m-%d')}", className='mb-2')
+                        ut.unknown_symbols_note([stock_symbol]) or ut.stale_data_note()
+                        or f"No data available for {stock_symbol} from {investment_date.strftime('%Y-%m-%d')}", className='mb-2')
                 ])
         return dash.no_update
     
@@ -928,8 +1120,8 @@ def get_data_callbacks(app, server, cache):
 
     @app.callback(
         Output('analyst-recommendations-content', 'children'),
-        [Input('individual-stocks-store', 'data'),
-          Input('plotly-theme-store', 'data')]
+        [Input('individual-stocks-store', 'data')],
+        [State('plotly-theme-store', 'data')]
     )
     def update_analyst_recommendations(stock_symbols, plotly_theme):
         if not stock_symbols:
@@ -949,16 +1141,20 @@ def get_data_callbacks(app, server, cache):
 
         for symbol in stock_symbols:
             # df = ut.fetch_analyst_recommendations(symbol)
-            df = fetch_analyst_reco_with_cache(symbol)
+            try:
+                df = fetch_analyst_reco_with_cache(symbol)
+            except Exception as e:
+                print(f"Analyst recommendations not available for {symbol}: {e}")
+                df = pd.DataFrame()
 
             if not df.empty:
                 fig = ut.generate_recommendations_heatmap(df, plotly_theme)
                 recommendations_content.append(
                     html.H4(f"{symbol}", className='mt-3'))
-                recommendations_content.append(dcc.Graph(figure=fig))
+                recommendations_content.append(dcc.Graph(id={'type': 'recommendations-graph', 'index': symbol}, figure=fig))
             else:
                 recommendations_content.append(
-                    html.P(f"No analyst recommendations found for {symbol}."))
+                    html.P(ut.unknown_symbols_note([symbol]) or f"No analyst recommendations found for {symbol}."))
 
         return recommendations_content
     
@@ -980,8 +1176,7 @@ def get_data_callbacks(app, server, cache):
             raise PreventUpdate
 
         symbol = button_id['index']
-        ticker = yf.Ticker(symbol)
-        news = ticker.news
+        news = md.get_ticker_news(symbol)
 
         if not news or len(news) <= 4:
             return dash.no_update, dash.no_update, dash.no_update
@@ -1049,12 +1244,13 @@ def get_data_callbacks(app, server, cache):
         index = json.loads(triggered_id)['index']
         stock_symbol = watchlist[index]
 
-        # Fetch financials data
-        ticker = yf.Ticker(stock_symbol)
-        financials = ticker.financials
-        balance_sheet = ticker.balance_sheet
-        cashflow = ticker.cashflow
-        info = ticker.info
+        # Fetch financials data (served from the statements cache after the first open)
+        with priority('premium'):
+            statements = md.get_financial_statements(stock_symbol)
+            info = md.get_ticker_info(stock_symbol)
+        financials = statements['financials']
+        balance_sheet = statements['balance_sheet']
+        cashflow = statements['cashflow']
 
         if financials is not None and not financials.empty:
             income_statement_content = ut.create_financials_table(financials)
@@ -1168,10 +1364,10 @@ def get_data_callbacks(app, server, cache):
         ],
         [
             Input('url', 'pathname'),  # Ensure callback only triggers when on the correct page
-            Input('generate-forecast-button', 'n_clicks'),
-            Input('plotly-theme-store', 'data')
+            Input('generate-forecast-button', 'n_clicks')
         ],
         [
+            State('plotly-theme-store', 'data'),
             State('forecast-stock-input', 'value'),
             State('forecast-horizon-input', 'value'),
             State('predefined-ranges', 'value'),
@@ -1212,32 +1408,45 @@ def get_data_callbacks(app, server, cache):
         if len(selected_stocks) > 3:
             return no_update, "Please select up to 3 stocks only.", no_update, no_update, forecast_attempt
     
-        # Generate forecast data
-        forecast_data = ut.generate_forecast_data(selected_stocks, horizon)
-        forecast_figures = []
-        kpi_outputs = []
+        # The input histories come from the local store; the Prophet fit only
+        # runs when no cached forecast exists for this version of them
+        with priority('premium'):
+            histories = ut.load_forecast_histories(selected_stocks)
         today = pd.to_datetime('today')
-    
-        for symbol in selected_stocks:
-            if 'error' in forecast_data[symbol]:
-                continue
-    
-            # Ensure that each KPI value is rounded appropriately
-            kpi = forecast_data[symbol]['kpi']
-            kpi['expected_price'] = round(kpi['expected_price'])  # Round to integer
-            kpi['latest_actual_price'] = round(kpi['latest_actual_price'])  # Round to integer
-            kpi['upper_bound'] = round(kpi['upper_bound'])  # Round to integer
-            kpi['lower_bound'] = round(kpi['lower_bound'])  # Round to integer
-            kpi['percentage_difference'] = round(kpi['percentage_difference'], 2)  # Keep two decimals for percentage
-    
-            # Generate figure and KPI card
-            fig = ut.create_forecast_figure(forecast_data[symbol], plotly_theme, symbol, predefined_range, today)
-            kpi_output = ut.create_kpi_card(kpi, symbol)  # Pass integers and percentages
-    
-            forecast_figures.append(fig)
-            kpi_outputs.append(kpi_output)
-    
-        combined_fig = ut.combine_forecast_figures(forecast_figures, plotly_theme)
+        forecast_symbols = [symbol for symbol in selected_stocks
+                            if histories.get(symbol) is not None and not histories[symbol].empty]
+
+        def build_forecast_figure():
+            with priority('premium'):
+                forecast_data = ut.generate_forecast_data(forecast_symbols, horizon, histories)
+            fitted = [symbol for symbol in forecast_symbols if 'error' not in forecast_data[symbol]]
+
+            for symbol in fitted:
+                # Ensure that each KPI value is rounded appropriately
+                kpi = forecast_data[symbol]['kpi']
+                kpi['expected_price'] = round(kpi['expected_price'])  # Round to integer
+                kpi['latest_actual_price'] = round(kpi['latest_actual_price'])  # Round to integer
+                kpi['upper_bound'] = round(kpi['upper_bound'])  # Round to integer
+                kpi['lower_bound'] = round(kpi['lower_bound'])  # Round to integer
+                kpi['percentage_difference'] = round(kpi['percentage_difference'], 2)  # Keep two decimals for percentage
+
+            forecast_figures = [
+                ut.create_forecast_figure(forecast_data[symbol], plotly_theme, symbol, predefined_range, today)
+                for symbol in fitted
+            ]
+            # KPIs travel with the figure so the cards match the bands shown
+            kpis = {symbol: forecast_data[symbol]['kpi'] for symbol in fitted}
+            return ut.combine_forecast_figures(forecast_figures, plotly_theme), kpis
+
+        # Keyed on the inputs only: Prophet's uncertainty bands come from unseeded
+        # sampling, so the forecast frame differs on every run. The range filter
+        # in create_forecast_figure only moves with the calendar day
+        figure_inputs = (tuple(forecast_symbols), horizon, predefined_range, plotly_theme, str(today.date()),
+                         tuple(frame_version(histories[symbol]) for symbol in forecast_symbols))
+        combined_fig, kpis = figure_cache.get_or_build('forecast', figure_inputs, build_forecast_figure,
+                                                       price_ttl('1d', forecast_symbols))
+        # Pass integers and percentages
+        kpi_outputs = [ut.create_kpi_card(kpis[symbol], symbol) for symbol in forecast_symbols if symbol in kpis]
     
         # Store both figure and KPI data
         forecast_store_data = {
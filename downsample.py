@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+
+# Points per line trace worth sending for a chart on this kind of screen;
+# about two points per horizontal pixel is visually lossless for LTTB
+TARGET_POINTS = {'desktop': 1200, 'mobile': 500}
+# A candle needs a few pixels of width to be readable
+POINTS_PER_CANDLE = 4
+# Buckets up to this size are scanned without numpy in LTTB
+SMALL_BUCKET = 32
+
+
+def target_points(device_type):
+    return TARGET_POINTS.get(device_type, TARGET_POINTS['desktop'])
+
+
+def lttb_indices(x, y, threshold):
+    """Positions kept by Largest-Triangle-Three-Buckets downsampling of (x, y).
+
+    The first and last points are always kept; every bucket in between keeps
+    the point forming the largest triangle with the previously kept point and
+    the average of the next bucket, which preserves peaks and troughs.
+    """
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # threshold - 2 buckets over the points between first and last
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(x[:n - 1], edges[:-1]) / counts
+    avg_y = np.add.reduceat(y[:n - 1], edges[:-1]) / counts
+    # Each bucket looks ahead to the next bucket's average; the last one to the final point
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    # The pick in each bucket depends on the previous pick, so this part is a
+    # loop; small buckets run as plain Python, which beats numpy's per-call overhead
+    xs, ys, bounds = x.tolist(), y.tolist(), edges.tolist()
+    next_x, next_y = next_x.tolist(), next_y.tolist()
+    kept = [0]
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = bounds[i], bounds[i + 1]
+        ax, ay, cx, cy = xs[a], ys[a], next_x[i], next_y[i]
+        if hi - lo > SMALL_BUCKET:
+            area = np.abs((ax - cx) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (cy - ay))
+            a = lo + int(area.argmax())
+        else:
+            best = -1.0
+            for j in range(lo, hi):
+                area = abs((ax - cx) * (ys[j] - ay) - (ax - xs[j]) * (cy - ay))
+                if area > best:
+                    best, a = area, j
+        kept.append(a)
+    kept.append(n - 1)
+    return np.array(kept, dtype=np.int64)
+
+
+def downsample_series(series, threshold):
+    """LTTB-downsample a time series to at most threshold points, skipping NaNs (e.g. MA warm-up)."""
+    series = series.dropna()
+    if len(series) <= threshold:
+        return series
+    kept = lttb_indices(series.index.asi8, series.to_numpy(dtype='float64'), threshold)
+    return series.iloc[kept]
+
+
+def _bucket_starts(n, buckets):
+    # Equal-width runs of consecutive rows, e.g. 2520 daily bars into 300 buckets of 8-9 days
+    return np.unique(np.linspace(0, n, buckets, endpoint=False).astype(np.int64))
+
+
+def aggregate_ohlc(df, threshold):
+    """Merge runs of consecutive bars so at most threshold candles remain.
+
+    Each bucket keeps the first Open, highest High, lowest Low, last Close and
+    summed Volume, stamped with the time of its first bar.
+    """
+    n = len(df)
+    if n <= threshold:
+        return df
+    starts = _bucket_starts(n, threshold)
+    ends = np.append(starts[1:], n) - 1
+    columns = {
+        'Open': df['Open'].to_numpy(dtype='float64')[starts],
+        'High': np.fmax.reduceat(df['High'].to_numpy(dtype='float64'), starts),
+        'Low': np.fmin.reduceat(df['Low'].to_numpy(dtype='float64'), starts),
+        'Close': df['Close'].to_numpy(dtype='float64')[ends],
+    }
+    if 'Volume' in df.columns:
+        columns['Volume'] = np.add.reduceat(np.nan_to_num(df['Volume'].to_numpy(dtype='float64')), starts)
+    return pd.DataFrame(columns, index=df.index[starts])
+
+
+def aggregate_volume(volume, threshold):
+    """Sum volume over runs of consecutive bars so at most threshold bars remain."""
+    n = len(volume)
+    if n <= threshold:
+        return volume
+    starts = _bucket_starts(n, threshold)
+    summed = np.add.reduceat(np.nan_to_num(volume.to_numpy(dtype='float64')), starts)
+    return pd.Series(summed, index=volume.index[starts], name=volume.name)
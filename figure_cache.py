@@ -0,0 +1,93 @@
+import hashlib
+import json
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+
+_stats_lock = threading.Lock()
+_stats = {
+    'hits': 0,
+    'misses': 0,
+    'build_seconds': 0.0,  # Figure construction plus serialization on misses
+    'stored_bytes': 0,
+}
+
+
+def _record(**increments):
+    with _stats_lock:
+        for name, value in increments.items():
+            _stats[name] += value
+
+
+def figure_stats():
+    """Hit rate and build time of the figure cache in this worker."""
+    with _stats_lock:
+        stats = dict(_stats)
+    if stats['misses']:
+        stats['avg_build_ms'] = round(stats['build_seconds'] / stats['misses'] * 1000, 1)
+    return stats
+
+
+def frame_version(df):
+    """Fingerprint of the data a figure is drawn from: span, length and last row.
+
+    A new bar, an updated live bar or a shifted range start all change it, so
+    figure keys never need explicit invalidation. Numbers are compared as
+    float32, the precision the shared tier stores prices at, so a frame read
+    from the hot tier and its copy decoded from the shared tier give the same
+    version in every worker. Timestamps drop their zone for the same reason.
+    """
+    if df is None or len(df) == 0:
+        return None
+    last = df.iloc[-1] if isinstance(df, pd.DataFrame) else df.iloc[-1:]
+    numbers = pd.to_numeric(last, errors='coerce').to_numpy(dtype='float64')
+    last_row = hashlib.sha1(numbers.astype(np.float32).tobytes()).hexdigest()
+    wall_time = lambda ts: str(ts.tz_localize(None) if getattr(ts, 'tzinfo', None) else ts)
+    return (len(df), wall_time(df.index[0]), wall_time(df.index[-1]), last_row)
+
+
+class FigureCache:
+    """Serialized Plotly figures shared across users and workers.
+
+    Entries are keyed on the view inputs (symbols, range, chart options,
+    theme) plus the version of the data drawn. Hits return the figure as a
+    plain dict parsed from the stored JSON, so identical views skip
+    make_subplots, trace validation and Plotly's own serialization.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def key(self, name, inputs):
+        digest = hashlib.sha1(repr(inputs).encode('utf-8')).hexdigest()
+        return f"figure:{name}:{digest}"
+
+    def get(self, key):
+        """Return (figure dict, extra) for a key from key(), or None once it has expired."""
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        _record(hits=1)
+        return json.loads(entry[0]), entry[1]
+
+    def get_or_build(self, name, inputs, build, timeout):
+        """Return (figure dict, extra); build() -> (figure, extra) runs only on a miss.
+
+        extra carries small JSON-safe values computed alongside the figure,
+        such as the graph height.
+        """
+        key = self.key(name, inputs)
+        entry = self.cache.get(key)
+        if entry is not None:
+            _record(hits=1)
+        else:
+            started = time.perf_counter()
+            fig, extra = build()
+            entry = (pio.to_json(fig, validate=False), extra)
+            self.cache.set(key, entry, timeout)
+            _record(misses=1, build_seconds=time.perf_counter() - started, stored_bytes=len(entry[0]))
+        return json.loads(entry[0]), entry[1]
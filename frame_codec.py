@@ -0,0 +1,84 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+
+INDEX_COLUMN = '__index__'
+VOLUME_COLUMN = 'Volume'
+
+_stats_lock = threading.Lock()
+_stats = {
+    'frames_encoded': 0,
+    'encoded_bytes': 0,
+    'in_memory_bytes': 0,  # float64 footprint of the encoded frames, for comparison
+    'encode_seconds': 0.0,
+    'frames_decoded': 0,
+    'decode_seconds': 0.0,
+}
+
+
+def _record(**increments):
+    with _stats_lock:
+        for name, value in increments.items():
+            _stats[name] += value
+
+
+def codec_stats():
+    """Serialized size and encode/decode time of every frame this worker handled."""
+    with _stats_lock:
+        stats = dict(_stats)
+    if stats['encoded_bytes']:
+        stats['compression_ratio'] = round(stats['in_memory_bytes'] / stats['encoded_bytes'], 2)
+    if stats['frames_decoded']:
+        stats['avg_decode_ms'] = round(stats['decode_seconds'] / stats['frames_decoded'] * 1000, 3)
+    return stats
+
+
+def encode_frame(df):
+    """Serialize an OHLCV frame as compressed Arrow IPC: float32 prices, int64 volume."""
+    started = time.perf_counter()
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+
+    arrays = {INDEX_COLUMN: pa.array(index.values)}
+    for column in df.columns:
+        values = df[column].to_numpy(dtype='float64')
+        if column == VOLUME_COLUMN:
+            missing = np.isnan(values)
+            arrays[column] = pa.array(np.nan_to_num(values).astype('int64'), mask=missing)
+        else:
+            arrays[column] = pa.array(values.astype('float32'))
+    table = pa.table(arrays)
+    table = table.replace_schema_metadata({'index_name': df.index.name or ''})
+
+    sink = pa.BufferOutputStream()
+    options = pa.ipc.IpcWriteOptions(compression='zstd')
+    with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+        writer.write_table(table)
+    data = sink.getvalue().to_pybytes()
+
+    _record(frames_encoded=1, encoded_bytes=len(data), in_memory_bytes=int(index.values.nbytes + len(df.columns) * len(df) * 8),
+            encode_seconds=time.perf_counter() - started)
+    return data
+
+
+def decode_frame(data):
+    """Inverse of encode_frame; prices come back as a single float64 block."""
+    started = time.perf_counter()
+    table = pa.ipc.open_file(pa.BufferReader(data)).read_all()
+    metadata = table.schema.metadata or {}
+    index_name = metadata.get(b'index_name', b'').decode() or None
+
+    index = pd.DatetimeIndex(table.column(INDEX_COLUMN).to_numpy(), name=index_name)
+    columns = [name for name in table.column_names if name != INDEX_COLUMN]
+    values = np.column_stack([
+        table.column(name).to_numpy().astype('float64') for name in columns
+    ]) if columns else np.empty((len(index), 0))
+    df = pd.DataFrame(values, index=index, columns=columns, copy=False)
+
+    _record(frames_decoded=1, decode_seconds=time.perf_counter() - started)
+    return df
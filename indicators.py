@@ -0,0 +1,161 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+
+# Indicators are named by spec strings, so any window can be requested:
+#   SMA_<n>, EMA_<n>              moving averages (price overlay)
+#   BB_<n>_<k>                    Bollinger bands, k standard deviations (price overlay)
+#   RSI_<n>                       Wilder's relative strength index (own panel)
+#   MACD_<fast>_<slow>_<signal>   MACD line, signal line and histogram (own panel)
+#   ATR_<n>                       Wilder's average true range (own panel)
+SPEC_PATTERNS = {
+    'SMA': re.compile(r'^SMA_(\d+)$'),
+    'EMA': re.compile(r'^EMA_(\d+)$'),
+    'BB': re.compile(r'^BB_(\d+)_(\d+(?:\.\d+)?)$'),
+    'RSI': re.compile(r'^RSI_(\d+)$'),
+    'MACD': re.compile(r'^MACD_(\d+)_(\d+)_(\d+)$'),
+    'ATR': re.compile(r'^ATR_(\d+)$'),
+}
+OVERLAYS = ('SMA', 'EMA', 'BB')
+
+
+def parse_spec(spec):
+    """Return (kind, params) for a spec string, or None if it is not an indicator."""
+    for kind, pattern in SPEC_PATTERNS.items():
+        match = pattern.match(spec)
+        if match:
+            params = tuple(float(p) if '.' in p else int(p) for p in match.groups())
+            if all(p > 0 for p in params):
+                return kind, params
+    return None
+
+
+def indicator_specs(selected):
+    """The indicator specs among the selected chart options, in a stable order."""
+    return tuple(sorted(spec for spec in set(selected or ()) if parse_spec(spec)))
+
+
+def specs_from_text(text):
+    """'sma 50, ema 21' -> ['SMA_50', 'EMA_21']; parts that are not an indicator are dropped."""
+    specs = [re.sub(r'\s+', '_', part.strip().upper()) for part in (text or '').split(',')]
+    return [spec for spec in specs if parse_spec(spec)]
+
+
+def is_overlay(spec):
+    return parse_spec(spec)[0] in OVERLAYS
+
+
+def output_columns(spec):
+    """Columns an indicator adds, e.g. BB_20_2 -> BB_20_2_upper, BB_20_2_mid, BB_20_2_lower."""
+    kind = parse_spec(spec)[0]
+    if kind == 'BB':
+        return [f"{spec}_upper", f"{spec}_mid", f"{spec}_lower"]
+    if kind == 'MACD':
+        return [spec, f"{spec}_signal", f"{spec}_hist"]
+    return [spec]
+
+
+def _rolling_mean_std(matrix, window):
+    """Rolling mean and population std down every column at once, from running sums.
+
+    Windows containing a NaN come out NaN, like pandas' rolling with the
+    default min_periods.
+    """
+    values = matrix.to_numpy()
+    missing = np.isnan(values)
+    # Centre each column on its first valid value to keep the squared sums well conditioned
+    offset = np.nan_to_num(matrix.bfill().to_numpy()[:1])
+    filled = np.where(missing, 0.0, values - offset)
+    padded = lambda a: np.vstack([np.zeros((1, a.shape[1])), np.cumsum(a, axis=0)])
+    sums, squares, gaps = padded(filled), padded(filled ** 2), padded(missing.astype('float64'))
+
+    mean = np.full(values.shape, np.nan)
+    std = np.full(values.shape, np.nan)
+    if len(values) >= window:
+        window_sum = sums[window:] - sums[:-window]
+        window_squares = squares[window:] - squares[:-window]
+        complete = (gaps[window:] - gaps[:-window]) == 0
+        window_mean = window_sum / window
+        variance = np.maximum(window_squares / window - window_mean ** 2, 0.0)
+        mean[window - 1:] = np.where(complete, window_mean + offset, np.nan)
+        std[window - 1:] = np.where(complete, np.sqrt(variance), np.nan)
+    wrap = lambda a: pd.DataFrame(a, index=matrix.index, columns=matrix.columns)
+    return wrap(mean), wrap(std)
+
+
+def _ema(matrix, span=None, alpha=None):
+    return matrix.ewm(span=span, alpha=alpha, adjust=False, min_periods=span or int(round(1 / alpha))).mean()
+
+
+def _compute(kind, params, close, high, low):
+    """One indicator over whole price matrices (rows are bars, columns are symbols)."""
+    if kind == 'SMA':
+        return [_rolling_mean_std(close, params[0])[0]]
+    if kind == 'EMA':
+        return [_ema(close, span=params[0])]
+    if kind == 'BB':
+        window, width = params
+        mid, std = _rolling_mean_std(close, window)
+        return [mid + width * std, mid, mid - width * std]
+    if kind == 'RSI':
+        delta = close.diff()
+        gain = _ema(delta.clip(lower=0), alpha=1 / params[0])
+        loss = _ema(-delta.clip(upper=0), alpha=1 / params[0])
+        return [100 - 100 / (1 + gain / loss)]
+    if kind == 'MACD':
+        fast, slow, signal = params
+        macd = _ema(close, span=fast) - _ema(close, span=slow)
+        signal_line = _ema(macd, span=signal)
+        return [macd, signal_line, macd - signal_line]
+    if kind == 'ATR':
+        prev_close = close.shift(1)
+        true_range = np.fmax(high - low, np.fmax((high - prev_close).abs(), (low - prev_close).abs()))
+        return [_ema(true_range, alpha=1 / params[0])]
+    raise ValueError(f"Unknown indicator kind: {kind}")
+
+
+def compute_indicators(frames, specs):
+    """Compute indicator columns for many symbols at once.
+
+    frames maps symbol -> OHLCV DataFrame. Every indicator depends only on the
+    order of a symbol's bars, so all symbols are stacked into one matrix per
+    price column with their last bars aligned, shorter histories padded with
+    leading NaNs like an unfinished warm-up. Each indicator is then a single
+    vectorized pass over every symbol, even when sessions or holidays differ.
+    Aligning on a union of timestamps instead would leave gaps inside each
+    series that break rolling windows. Returns symbol -> DataFrame of
+    output_columns(spec) for each spec, on the symbol's own index.
+    """
+    frames = {symbol: df for symbol, df in frames.items() if df is not None and not df.empty}
+    if not frames:
+        return {}
+    symbols = list(frames)
+    rows = max(len(df) for df in frames.values())
+
+    def matrix(column):
+        values = np.full((rows, len(symbols)), np.nan)
+        for position, symbol in enumerate(symbols):
+            series = frames[symbol][column].to_numpy(dtype='float64')
+            values[rows - len(series):, position] = series
+        return pd.DataFrame(values, columns=symbols)
+
+    close = matrix('Close')
+    needs_range = any(parse_spec(spec)[0] == 'ATR' for spec in specs)
+    high, low = (matrix('High'), matrix('Low')) if needs_range else (None, None)
+
+    outputs = {}
+    for spec in specs:
+        kind, params = parse_spec(spec)
+        for column, values in zip(output_columns(spec), _compute(kind, params, close, high, low)):
+            outputs[column] = values
+
+    # (bars, symbols, columns) block, sliced back into one frame per symbol
+    columns = list(outputs)
+    block = np.stack([outputs[column].to_numpy() for column in columns], axis=2)
+    results = {}
+    for position, symbol in enumerate(symbols):
+        index = frames[symbol].index
+        results[symbol] = pd.DataFrame(block[rows - len(index):, position, :], index=index, columns=columns)
+    return results
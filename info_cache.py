@@ -0,0 +1,88 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class TickerInfoCache:
+    """Per-symbol JSON payloads (projected Ticker.info, financial statements) with a TTL.
+
+    Entries live in memory and in SQLite, so every worker on the host (and the
+    weekly KPI job in background_tasks.py) shares one fetch per symbol per TTL.
+    """
+
+    def __init__(self, path, ttl, table='ticker_info'):
+        self.path = path
+        self.ttl = ttl
+        self.table = table
+        self._lock = threading.Lock()
+        self._memory = {}
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    symbol TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    fetched_at REAL NOT NULL
+                )
+            """)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, symbol, allow_stale=False):
+        """Return a fresh cached payload, or None if missing or expired.
+
+        allow_stale returns the last stored payload regardless of age, as a
+        fallback when the upstream is failing.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(symbol)
+        if entry is None or (now - entry[1] > self.ttl and not allow_stale):
+            # Another worker may have refreshed it on disk
+            try:
+                row = self._connection().execute(
+                    f'SELECT payload, fetched_at FROM {self.table} WHERE symbol = ?', (symbol,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                print(f"{self.table} cache read failed for {symbol}: {e}")
+                row = None
+            if row is None:
+                return None
+            entry = (json.loads(row[0]), row[1])
+            with self._lock:
+                self._memory[symbol] = entry
+
+        info, fetched_at = entry
+        if now - fetched_at > self.ttl and not allow_stale:
+            return None
+        return dict(info)
+
+    def set(self, symbol, info):
+        now = time.time()
+        with self._lock:
+            self._memory[symbol] = (dict(info), now)
+        try:
+            with self._connection() as conn:
+                conn.execute(
+                    f'INSERT OR REPLACE INTO {self.table} (symbol, payload, fetched_at) VALUES (?, ?, ?)',
+                    (symbol, json.dumps(info), now)
+                )
+        except sqlite3.Error as e:
+            print(f"{self.table} cache write failed for {symbol}: {e}")
+
+
+CACHE_PATH = os.getenv('PRICE_STORE_PATH', 'price_store.db')
+
+info_cache = TickerInfoCache(CACHE_PATH, ttl=6 * 3600)
+# Statements only change quarterly
+statements_cache = TickerInfoCache(CACHE_PATH, ttl=7 * 24 * 3600, table='financial_statements')
+# "No data" results per (symbol, kind); each entry carries its own expiry
+negative_cache = TickerInfoCache(CACHE_PATH, ttl=7 * 24 * 3600, table='negative_cache')
@@ -690,6 +690,7 @@ def create_dashboard_layout(watchlist_management_layout):
                                 multi=False,
                                 searchable=True
                             ),
+                            html.Div(id='stock-input-message'),
                         ], style={'margin-top': '15px'}),
 
                         # Date range selection (conditionally displayed based on tab)
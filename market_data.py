@@ -0,0 +1,352 @@
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+from info_cache import info_cache, negative_cache, statements_cache
+from providers import STATEMENT_NAMES, create_provider
+from rate_limiter import current_priority, limiter
+
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36'
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised instead of calling Yahoo while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Fail fast once the upstream error rate crosses a threshold.
+
+    Outcomes of the last `window` seconds are tracked. With at least
+    `min_calls` calls and an error rate of `failure_rate` or more the breaker
+    opens and rejects calls for `cooldown` seconds, then lets a single probe
+    through (half-open): success closes it, failure re-opens it.
+    """
+
+    def __init__(self, failure_rate=0.5, min_calls=10, window=60, cooldown=30):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._outcomes = deque()  # (timestamp, ok)
+        self.state = 'closed'
+        self._opened_at = 0.0
+        self._probing = False
+        self.failures = 0  # Failed calls since start, so callers can tell whether a call of theirs saw one
+
+    @property
+    def degraded(self):
+        """True while upstream data may be missing and views serve stored data."""
+        return self.state != 'closed'
+
+    def before_call(self):
+        with self._lock:
+            if self.state == 'closed':
+                return
+            if self.state == 'open' and time.time() - self._opened_at >= self.cooldown:
+                self.state = 'half-open'
+            if self.state == 'half-open' and not self._probing:
+                self._probing = True
+                return
+        raise CircuitOpenError('Market data upstream unavailable (circuit open)')
+
+    def record(self, ok):
+        now = time.time()
+        with self._lock:
+            if not ok:
+                self.failures += 1
+            if self.state == 'half-open':
+                self._probing = False
+                if ok:
+                    self.state = 'closed'
+                    self._outcomes.clear()
+                else:
+                    self._trip(now)
+                return
+
+            self._outcomes.append((now, ok))
+            while self._outcomes and self._outcomes[0][0] < now - self.window:
+                self._outcomes.popleft()
+            failures = sum(1 for _, outcome in self._outcomes if not outcome)
+            if (self.state == 'closed' and len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.failure_rate):
+                self._trip(now)
+
+    def _trip(self, now):
+        print(f"Market data circuit opened for {self.cooldown}s")
+        self.state = 'open'
+        self._opened_at = now
+        self._outcomes.clear()
+
+
+breaker = CircuitBreaker()
+
+
+class UpstreamAdapter(HTTPAdapter):
+    """HTTPAdapter that routes every request through the circuit breaker and rate limiter."""
+
+    def __init__(self, breaker, limiter, **kwargs):
+        self.breaker = breaker
+        self.limiter = limiter
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        # Fail fast before spending a token on a call that would be rejected
+        self.breaker.before_call()
+        try:
+            self.limiter.acquire()
+            response = super().send(request, **kwargs)
+        except BaseException:
+            # Any escape counts, not only RequestException: a half-open breaker
+            # stays stuck with its probe in flight until the outcome is recorded
+            self.breaker.record(False)
+            raise
+        # Throttling and server errors count as failures; 404s for unknown symbols do not
+        self.breaker.record(response.status_code != 429 and response.status_code < 500)
+        return response
+
+
+def create_http_session(pool_size=20):
+    """Create a keep-alive session with a connection pool sized for the worker's threads."""
+    session = requests.Session()
+    adapter = UpstreamAdapter(breaker, limiter, pool_connections=4, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    return session
+
+
+# One pooled session per worker for all Yahoo traffic. yfinance keeps its
+# cookie/crumb on this session, so the handshake happens once per worker.
+http_session = create_http_session()
+
+
+# Every market data call goes through this backend: live yfinance by default,
+# recorded fixtures for offline benchmarks (see providers.create_provider)
+provider = create_provider(http_session)
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one in-flight fetch.
+
+    The first caller for a key runs the fetch; callers arriving while it is in
+    flight wait for it and share its result (or its exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+
+single_flight = SingleFlight()
+
+
+# How long a "no data" answer is trusted, per data kind
+NEGATIVE_TTLS = {'prices': 24 * 3600, 'news': 3600, 'recommendations': 24 * 3600}
+# An empty daily download over at least this long a window means the symbol has no data
+FULL_BACKFILL_WINDOW = pd.Timedelta(days=365)
+
+
+def is_known_missing(symbol, kind):
+    """True if Yahoo recently had no data of this kind ('prices', 'news', 'recommendations') for the symbol."""
+    entry = negative_cache.get(f"{kind}:{symbol}")
+    return entry is not None and entry['until'] > time.time()
+
+
+def remember_missing(symbol, kind):
+    if breaker.degraded:
+        return  # Empty answers during an outage say nothing about the symbol
+    ttl = NEGATIVE_TTLS[kind.split(':')[0]]
+    negative_cache.set(f"{kind}:{symbol}", {'until': time.time() + ttl})
+
+
+def is_unknown_symbol(symbol):
+    """A symbol without any price history is treated as mistyped or delisted."""
+    return is_known_missing(symbol, 'prices')
+
+
+def _is_full_daily_window(start, end, interval, period):
+    if interval != '1d':
+        return False
+    if period:
+        return period == 'max' or period.endswith('y')
+    if start is None:
+        return False
+    return pd.Timestamp(end or pd.Timestamp.now()) - pd.Timestamp(start) >= FULL_BACKFILL_WINDOW
+
+
+def download_stock_data_batch(symbols, start=None, end=None, interval='1d', period=None):
+    """Download price history for several symbols in one provider round trip."""
+    symbols = list(dict.fromkeys(symbols))  # Drop duplicates, keep order
+    if not symbols:
+        return {}
+
+    # yfinance's download threads do not inherit the caller's priority class,
+    # so only interactive downloads fan out
+    threaded = current_priority() == 'interactive'
+    failures_before = breaker.failures
+    try:
+        frames = provider.history(symbols, start, end, interval, period, threads=threaded)
+    except Exception as e:
+        print(f"Batch download failed for {symbols}: {e}")
+        return {}
+
+    # yfinance reports a timeout or a 429 during the download as a missing
+    # symbol, so misses only count when no upstream call failed meanwhile, and
+    # only Yahoo's own answers that the symbol has no data are recorded
+    if breaker.failures == failures_before:
+        full_window = _is_full_daily_window(start, end, interval, period)
+        for symbol in symbols:
+            if symbol not in frames and provider.not_found(symbol, full_window):
+                remember_missing(symbol, 'prices')
+    return frames
+
+
+def summarize_daily_change(hist):
+    """Return (previous_close, latest_close, change_percent) from recent daily bars."""
+    closes = hist['Close'].dropna() if hist is not None and not hist.empty else []
+    if len(closes) < 2:
+        return None, None, None
+    latest_close = closes.iloc[-1]
+    previous_close = closes.iloc[-2]
+    change_percent = ((latest_close - previous_close) /
+                      previous_close) * 100
+    return previous_close, latest_close, change_percent
+
+
+# The only Ticker.info fields the app reads (company info tab, chatbot
+# performance answer and the weekly KPI job)
+INFO_FIELDS = (
+    'longName', 'sector', 'industry', 'marketCap', 'totalRevenue', 'grossProfits',
+    'ebitda', 'netIncomeToCommon', 'dividendYield', 'trailingPE', 'priceToBook',
+    'beta', 'returnOnEquity', 'debtToEquity', 'fiftyTwoWeekHigh', 'fiftyTwoWeekLow',
+)
+
+
+def project_info(info):
+    """Keep only the Ticker.info fields the app uses."""
+    return {field: info[field] for field in INFO_FIELDS if info.get(field) is not None}
+
+
+def _fetch_ticker_info(symbol):
+    info = project_info(provider.info(symbol) or {})
+    info_cache.set(symbol, info)
+    return info
+
+
+def get_ticker_info(symbol):
+    """Return the projected Ticker.info for a symbol, fetched at most once per TTL."""
+    if is_unknown_symbol(symbol):
+        return {}
+    info = info_cache.get(symbol)
+    if info is None:
+        try:
+            info = single_flight.do(('info', symbol), _fetch_ticker_info, symbol)
+        except Exception as e:
+            # Last known good copy, however old
+            info = info_cache.get(symbol, allow_stale=True)
+            if info is None:
+                raise
+            print(f"Serving stored info for {symbol}: {e}")
+    return info
+
+
+def _fetch_ticker_news(symbol):
+    news = provider.news(symbol)
+    if news is None:
+        return []  # No valid answer (throttled, garbled); try again next time
+    if not news:
+        remember_missing(symbol, 'news')
+    return news
+
+
+def get_ticker_news(symbol):
+    """Fetch Ticker.news, sharing one upstream call between concurrent callers."""
+    if is_unknown_symbol(symbol) or is_known_missing(symbol, 'news'):
+        return []
+    return single_flight.do(('news', symbol), _fetch_ticker_news, symbol)
+
+
+def get_recommendations(symbol):
+    """Return the analyst recommendations table for a symbol (may be None or empty)."""
+    return provider.recommendations(symbol)
+
+
+def search_symbols(query, limit=3):
+    """Return [(symbol, name)] from the provider's symbol search."""
+    return provider.search(query, limit)
+
+
+_statement_pool = ThreadPoolExecutor(max_workers=6, thread_name_prefix='statements')
+
+
+def _fetch_statements(symbol):
+    # Each statement is a separate Yahoo request, so fetch them side by side,
+    # keeping the caller's priority class in the pool threads
+    futures = {
+        name: _statement_pool.submit(contextvars.copy_context().run, provider.financials, symbol, name)
+        for name in STATEMENT_NAMES
+    }
+    payload = {}
+    for name, future in futures.items():
+        df = future.result()
+        if df is not None and not df.empty:
+            payload[name] = df.to_json(orient='split', date_format='iso')
+    statements_cache.set(symbol, payload)
+    return payload
+
+
+def get_financial_statements(symbol):
+    """Return {statement name: DataFrame} for the financials modal, cached for a week."""
+    payload = {} if is_unknown_symbol(symbol) else statements_cache.get(symbol)
+    if payload is None:
+        try:
+            payload = single_flight.do(('statements', symbol), _fetch_statements, symbol)
+        except Exception as e:
+            payload = statements_cache.get(symbol, allow_stale=True)
+            if payload is None:
+                raise
+            print(f"Serving stored financial statements for {symbol}: {e}")
+    return {
+        name: pd.read_json(StringIO(payload[name]), orient='split') if name in payload else pd.DataFrame()
+        for name in STATEMENT_NAMES
+    }
@@ -0,0 +1,201 @@
+from datetime import date, datetime, time as dt_time, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+
+EXCHANGE_TZ = ZoneInfo('America/New_York')
+SESSION_OPEN = dt_time(9, 30)
+SESSION_CLOSE = dt_time(16, 0)
+EARLY_CLOSE = dt_time(13, 0)
+
+# How often the live daily bar is worth refetching while the session is open
+OPEN_DAILY_TTL = 300
+# Yahoo keeps adjusting the closing bar for a while after the bell
+CLOSE_SETTLE_SECONDS = 900
+# Never cache anything for less than this, even right before a bar boundary
+MIN_TTL = 30
+
+INTERVAL_SECONDS = {
+    '1m': 60, '2m': 120, '5m': 300, '15m': 900, '30m': 1800,
+    '60m': 3600, '90m': 5400, '1h': 3600,
+}
+
+# Yahoo indices that follow the NYSE session; other '^' indices (^SSMI,
+# ^FTSE, ^N225, ...) are quoted on their own exchange's hours
+US_INDICES = frozenset({
+    '^GSPC', '^DJI', '^IXIC', '^NDX', '^RUT', '^VIX', '^NYA', '^XAX', '^SP400', '^SP600',
+})
+
+
+def _nth_weekday(year, month, weekday, n):
+    first = date(year, month, 1)
+    return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+
+
+def _last_weekday(year, month, weekday):
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _easter(year):
+    # Anonymous Gregorian algorithm
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _observed(day):
+    # Saturday holidays move to Friday, Sunday holidays to Monday
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+@lru_cache(maxsize=16)
+def nyse_holidays(year):
+    """Full-day NYSE closures for a year."""
+    holidays = {
+        _nth_weekday(year, 1, 0, 3),    # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),    # Washington's Birthday
+        _easter(year) - timedelta(days=2),  # Good Friday
+        _last_weekday(year, 5, 0),      # Memorial Day
+        _observed(date(year, 7, 4)),    # Independence Day
+        _nth_weekday(year, 9, 0, 1),    # Labor Day
+        _nth_weekday(year, 11, 3, 4),   # Thanksgiving
+        _observed(date(year, 12, 25)),  # Christmas
+    }
+    # NYSE does not observe New Year's Day on the preceding Friday
+    new_year = _observed(date(year, 1, 1))
+    if new_year.year == year:
+        holidays.add(new_year)
+    if year >= 2022:
+        holidays.add(_observed(date(year, 6, 19)))  # Juneteenth
+    return frozenset(holidays)
+
+
+@lru_cache(maxsize=16)
+def nyse_early_closes(year):
+    """Sessions that close at 13:00 ET."""
+    days = {
+        date(year, 7, 3),
+        _nth_weekday(year, 11, 3, 4) + timedelta(days=1),  # Day after Thanksgiving
+        date(year, 12, 24),
+    }
+    return frozenset(day for day in days if is_trading_day(day))
+
+
+def is_trading_day(day):
+    return day.weekday() < 5 and day not in nyse_holidays(day.year)
+
+
+def session_bounds(day):
+    """Return the (open, close) datetimes of a trading day in exchange time."""
+    close = EARLY_CLOSE if day in nyse_early_closes(day.year) else SESSION_CLOSE
+    return (datetime.combine(day, SESSION_OPEN, EXCHANGE_TZ),
+            datetime.combine(day, close, EXCHANGE_TZ))
+
+
+def now_et():
+    return datetime.now(EXCHANGE_TZ)
+
+
+def current_session(now=None):
+    """Return (open, close) of the session in progress, or None if the market is closed."""
+    now = now or now_et()
+    if not is_trading_day(now.date()):
+        return None
+    open_at, close_at = session_bounds(now.date())
+    return (open_at, close_at) if open_at <= now < close_at else None
+
+
+def is_market_open(now=None):
+    return current_session(now) is not None
+
+
+def prices_moving(now=None):
+    """True from the open until CLOSE_SETTLE_SECONDS after the close, while the last bar can still change."""
+    now = now or now_et()
+    if not is_trading_day(now.date()):
+        return False
+    open_at, close_at = session_bounds(now.date())
+    return open_at <= now < close_at + timedelta(seconds=CLOSE_SETTLE_SECONDS)
+
+
+def follows_nyse(symbol):
+    """True if the symbol trades on the NYSE session this calendar models.
+
+    Exchange suffixes (NESN.SW, BP.L), non-US indices, futures and FX (=F,
+    =X) and crypto pairs (BTC-USD) keep other hours.
+    """
+    if symbol.startswith('^'):
+        return symbol in US_INDICES
+    return '.' not in symbol and '=' not in symbol and not symbol.endswith('-USD')
+
+
+def next_open(now=None):
+    """Return the next session open strictly after now."""
+    now = now or now_et()
+    day = now.date()
+    while True:
+        if is_trading_day(day):
+            open_at, _ = session_bounds(day)
+            if open_at > now:
+                return open_at
+        day += timedelta(days=1)
+
+
+def seconds_until_open(now=None):
+    now = now or now_et()
+    return max(int((next_open(now) - now).total_seconds()), MIN_TTL)
+
+
+def market_ttl(open_ttl, closed_ttl=None, now=None):
+    """TTL for data that only changes while the market is open.
+
+    During the session the TTL is open_ttl, cut off at the close. Outside it
+    the TTL runs until the next open, capped at closed_ttl when given.
+    """
+    now = now or now_et()
+    session = current_session(now)
+    if session is not None:
+        until_close = (session[1] - now).total_seconds()
+        return max(int(min(open_ttl, until_close)), MIN_TTL)
+    ttl = seconds_until_open(now)
+    return min(ttl, closed_ttl) if closed_ttl else ttl
+
+
+def price_ttl(interval, now=None, symbol=None):
+    """TTL for cached bars: until the next bar boundary while open, until the next open otherwise.
+
+    Symbols on other calendars (see follows_nyse) get a flat TTL of one bar,
+    at most OPEN_DAILY_TTL, at any time of day.
+    """
+    if symbol is not None and not follows_nyse(symbol):
+        return max(min(INTERVAL_SECONDS.get(interval, OPEN_DAILY_TTL), OPEN_DAILY_TTL), MIN_TTL)
+    now = now or now_et()
+    session = current_session(now)
+    if session is None:
+        if is_trading_day(now.date()):
+            settled_at = session_bounds(now.date())[1] + timedelta(seconds=CLOSE_SETTLE_SECONDS)
+            if now < settled_at and now.time() >= SESSION_OPEN:
+                return max(int((settled_at - now).total_seconds()), MIN_TTL)
+        return seconds_until_open(now)
+
+    open_at, close_at = session
+    bar = INTERVAL_SECONDS.get(interval)
+    if bar is None:
+        # Daily and longer bars: the last bar moves with every trade until the close
+        return market_ttl(OPEN_DAILY_TTL, now=now)
+    elapsed = (now - open_at).total_seconds()
+    next_boundary = open_at + timedelta(seconds=(elapsed // bar + 1) * bar)
+    return max(int((min(next_boundary, close_at) - now).total_seconds()), MIN_TTL)
@@ -0,0 +1,285 @@
+import functools
+import os
+import pickle
+import random
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from frame_codec import decode_frame, encode_frame
+from rate_limiter import priority
+
+
+class FrozenFrame:
+    """An immutable price frame: one read-only float64 block plus a datetime64 index.
+
+    Cache hits hand out DataFrames that are zero-copy views over these buffers.
+    Writing to an existing column raises, so callers add derived columns as new
+    arrays instead of mutating the cached data.
+    """
+
+    def __init__(self, index, columns, values, index_name=None):
+        self.index = index
+        self.columns = tuple(columns)
+        self.values = values
+        self.index_name = index_name
+        self._freeze()
+
+    def _freeze(self):
+        self.index.flags.writeable = False
+        self.values.flags.writeable = False
+
+    def __reduce__(self):
+        # The shared tier pickles values; ship the compact Arrow encoding instead
+        # of raw float64 buffers
+        return _thaw_frame, (encode_frame(self.view()),)
+
+    @property
+    def nbytes(self):
+        return self.index.nbytes + self.values.nbytes
+
+    def __len__(self):
+        return len(self.index)
+
+    def view(self, start=None, end=None):
+        """Return a DataFrame over [start, end) that shares the frozen buffers."""
+        lo = 0 if start is None else int(np.searchsorted(self.index, np.datetime64(pd.Timestamp(start)), side='left'))
+        hi = len(self.index) if end is None else int(np.searchsorted(self.index, np.datetime64(pd.Timestamp(end)), side='left'))
+        index = pd.DatetimeIndex(self.index[lo:hi], name=self.index_name)
+        return pd.DataFrame(self.values[lo:hi], index=index, columns=list(self.columns), copy=False)
+
+
+def freeze_frame(df):
+    """Pack an OHLCV DataFrame into a FrozenFrame (copies once, at insert time)."""
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    values = np.ascontiguousarray(df.to_numpy(dtype='float64'))
+    return FrozenFrame(index.values.copy(), df.columns, values, df.index.name)
+
+
+def _thaw_frame(data):
+    return freeze_frame(decode_frame(data))
+
+
+def estimate_size(value):
+    """Approximate in-memory footprint of a cached value in bytes."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, (np.ndarray, FrozenFrame)):
+        return int(value.nbytes)
+    if isinstance(value, (bytes, bytearray, str)):
+        return sys.getsizeof(value)
+    if isinstance(value, (int, float, bool, type(None))):
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    # Dash components, figures and anything else: size of the pickled form
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class ByteLRUCache:
+    """In-process LRU cache bounded by the approximate byte size of its entries."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (value, size, expires_at)
+        self._lock = threading.Lock()
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, size, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, timeout=None, size=None):
+        size = estimate_size(value) if size is None else size
+        if size > self.max_bytes:
+            # Would evict everything else; leave it to the shared tier, but never
+            # keep serving the value this one replaces
+            with self._lock:
+                if key in self._entries:
+                    self._remove(key)
+            return False
+        expires_at = time.time() + timeout if timeout else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, expires_at)
+            self.resident_bytes += size
+            while self.resident_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+        return True
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.resident_bytes -= size
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'resident_bytes': self.resident_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+# Entries are refreshed in the background during the last part of their life
+REFRESH_AHEAD_FRACTION = 0.2
+# TTLs are shortened by up to this fraction so entries set together expire apart
+TTL_JITTER = 0.1
+# How long a worker may hold the cross-worker refresh lock for one key
+REFRESH_LOCK_SECONDS = 60
+# Memoized results are kept this long as a fallback for upstream outages
+LAST_GOOD_SECONDS = 7 * 24 * 3600
+
+_refresh_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='refresh-ahead')
+
+
+class TieredCache:
+    """Per-worker hot tier (ByteLRUCache) in front of the shared Flask-Caching backend.
+
+    Both tiers hold (expires_at, refresh_at, value), so a value promoted into
+    the hot tier never outlives the shared entry. A read past refresh_at that
+    knows how to rebuild the value schedules one background refresh across
+    all workers and keeps serving the current value until it lands.
+    """
+
+    def __init__(self, local, shared, refresh_ahead=REFRESH_AHEAD_FRACTION, jitter=TTL_JITTER):
+        self.local = local
+        self.shared = shared
+        self.refresh_ahead = refresh_ahead
+        self.jitter = jitter
+        self._lock = threading.Lock()
+        self._refreshing = set()
+
+    def _shared_entry(self, key, now):
+        entry = self.shared.get(key)
+        # Skip missing, expired and old-format entries
+        if not isinstance(entry, tuple) or len(entry) != 3 or entry[0] <= now:
+            return None
+        self.local.set(key, entry, entry[0] - now)
+        return entry
+
+    def get(self, key, refresh=None, timeout=None):
+        """Return the cached value or None.
+
+        refresh(value) rebuilds the value and timeout (seconds or a callable)
+        is its new TTL; both are only used for refresh-ahead.
+        """
+        now = time.time()
+        entry = self.local.get(key) or self._shared_entry(key, now)
+        if entry is None:
+            return None
+
+        _, refresh_at, value = entry
+        if refresh is not None and now >= refresh_at:
+            # Another worker may already have refreshed it
+            latest = self._shared_entry(key, now)
+            if latest is not None and latest[1] > now:
+                return latest[2]
+            self._schedule_refresh(key, value, refresh, timeout)
+        return value
+
+    def set(self, key, value, timeout):
+        timeout *= 1 - random.uniform(0, self.jitter)
+        now = time.time()
+        entry = (now + timeout, now + timeout * (1 - self.refresh_ahead), value)
+        self.local.set(key, entry, timeout)
+        self.shared.set(key, entry, timeout=max(int(timeout), 1))
+
+    def _schedule_refresh(self, key, value, refresh, timeout):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        if not self.shared.add(f"{key}:refreshing", 1, timeout=REFRESH_LOCK_SECONDS):
+            with self._lock:
+                self._refreshing.discard(key)
+            return
+        _refresh_pool.submit(self._refresh, key, value, refresh, timeout)
+
+    def _refresh(self, key, value, refresh, timeout):
+        try:
+            with priority('prefetch'):
+                new_value = refresh(value)
+            if new_value is not None:
+                self.set(key, new_value, timeout() if callable(timeout) else timeout)
+        except Exception as e:
+            print(f"Refresh-ahead failed for {key}: {e}")
+        finally:
+            self.shared.delete(f"{key}:refreshing")
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _load(self, key, fn, args):
+        value = fn(*args)
+        if value is not None:
+            self.shared.set(f"last-good:{key}", value, timeout=LAST_GOOD_SECONDS)
+        return value
+
+    def memoize(self, timeout, key_prefix=None):
+        """Cache a function's result per positional arguments in both tiers.
+
+        timeout is either seconds or a zero-argument callable evaluated at store
+        time. If the function raises, the last value it returned is served.
+        """
+        def decorator(fn):
+            prefix = key_prefix or fn.__name__
+
+            @functools.wraps(fn)
+            def wrapper(*args):
+                key = f"{prefix}:{args!r}"
+                value = self.get(key, refresh=lambda _: self._load(key, fn, args), timeout=timeout)
+                if value is None:
+                    try:
+                        value = self._load(key, fn, args)
+                    except Exception as e:
+                        value = self.shared.get(f"last-good:{key}")
+                        if value is None:
+                            raise
+                        print(f"Serving last known good value for {key}: {e}")
+                        return value
+                    if value is not None:
+                        self.set(key, value, timeout() if callable(timeout) else timeout)
+                return value
+            return wrapper
+        return decorator
+
+
+hot_cache = ByteLRUCache(int(os.getenv('HOT_CACHE_MAX_BYTES', 128 * 1024 * 1024)))
@@ -54,8 +54,14 @@ layout = html.Div([
                 dcc.Checklist(
                     id='movag_input',
                     options=[
-                        {'label': '30-Day Moving Average (Trend Analysis)', 'value': '30D_MA'},
-                        {'label': '100-Day Moving Average (Long-Term Trends)', 'value': '100D_MA'},
+                        {'label': '30-Day Moving Average (Trend Analysis)', 'value': 'SMA_30'},
+                        {'label': '100-Day Moving Average (Long-Term Trends)', 'value': 'SMA_100'},
+                        {'label': '200-Day Moving Average', 'value': 'SMA_200'},
+                        {'label': '20-Day Exponential Moving Average', 'value': 'EMA_20'},
+                        {'label': 'Bollinger Bands (20, 2)', 'value': 'BB_20_2'},
+                        {'label': 'RSI (14)', 'value': 'RSI_14'},
+                        {'label': 'MACD (12, 26, 9)', 'value': 'MACD_12_26_9'},
+                        {'label': 'ATR (14)', 'value': 'ATR_14'},
                         {'label': 'Volume (Trading Activity)', 'value': 'Volume'}
                     ],
                     value=[],
@@ -63,6 +69,14 @@ layout = html.Div([
                     inputStyle={"margin-right": "10px"},
                     labelStyle={"margin-right": "20px"}
                 ),
+                dcc.Input(
+                    id='indicator-input',
+                    type='text',
+                    debounce=True,
+                    placeholder="Other indicators, e.g. SMA 50, EMA 9, RSI 7",
+                    className="form-control mt-2",
+                    style={"max-width": "400px"}
+                ),
             ], style={"margin-bottom": "20px"}),
             
             html.Div(id='load-warning', style={'color': 'red', 'margin': '10px 0'}),
@@ -0,0 +1,262 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import timedelta
+
+import pandas as pd
+
+import market_data as md
+
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+INTRADAY_RETENTION = timedelta(days=59)  # Yahoo only serves ~60 days of 5m/15m bars
+EPOCH = pd.Timestamp('1970-01-01')
+# Bumped when stored bars have to be rewritten; see _init_schema
+SCHEMA_VERSION = 1
+# Relative change in a settled bar's Close / Adj Close that means Yahoo has
+# re-adjusted the history (split or dividend) since we stored it
+READJUST_TOLERANCE = 1e-4
+
+
+def is_intraday(interval):
+    return interval.endswith('m') or interval.endswith('h')
+
+
+def to_epoch(timestamp):
+    """Convert a (wall-clock) timestamp to integer seconds since the epoch."""
+    timestamp = pd.Timestamp(timestamp)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_localize(None)
+    return int((timestamp - EPOCH) // pd.Timedelta(seconds=1))
+
+
+def epoch_index(df):
+    """Integer epoch seconds of a frame's index, in exchange wall-clock time."""
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is not None:
+        # Keep exchange wall-clock time; batches carry it labelled as UTC
+        index = index.tz_localize(None)
+    return ((index - EPOCH) // pd.Timedelta(seconds=1)).astype('int64')
+
+
+class PriceStore:
+    """On-disk OHLCV history per (symbol, interval), backed by SQLite.
+
+    Bars are stored in the exchange's wall-clock time, so reads line up with the
+    naive timestamps the callbacks compute from `pd.to_datetime('today')`.
+    A symbol we have already seen only costs a small tail fetch from the last
+    stored bar; everything else is served from disk.
+    """
+
+    def __init__(self, path, min_refresh_seconds=60):
+        self.path = path
+        self.min_refresh_seconds = min_refresh_seconds
+        self._local = threading.local()
+        self._init_schema()
+
+    def _connection(self):
+        # sqlite3 connections can't be shared across threads, so keep one per thread
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS bars (
+                    symbol TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    ts INTEGER NOT NULL,
+                    open REAL, high REAL, low REAL, close REAL, adj_close REAL, volume REAL,
+                    PRIMARY KEY (symbol, interval, ts)
+                ) WITHOUT ROWID
+            """)
+            # start_ts is the earliest start we have fetched from, last_ts the newest bar
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS coverage (
+                    symbol TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    start_ts INTEGER NOT NULL,
+                    last_ts INTEGER,
+                    checked_at REAL NOT NULL,
+                    PRIMARY KEY (symbol, interval)
+                )
+            """)
+            if conn.execute('PRAGMA user_version').fetchone()[0] < 1:
+                # Intraday bars from mixed-exchange batches used to be stored in
+                # UTC next to the same bars in exchange time; Yahoo still serves
+                # the last ~60 days, so drop them and let them refetch
+                for table in ('bars', 'coverage'):
+                    conn.execute(f"DELETE FROM {table} WHERE interval LIKE '%m' OR interval LIKE '%h'")
+            conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    def _coverage(self, symbol, interval):
+        row = self._connection().execute(
+            'SELECT start_ts, last_ts, checked_at FROM coverage WHERE symbol = ? AND interval = ?',
+            (symbol, interval)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'start_ts': row[0], 'last_ts': row[1], 'checked_at': row[2]}
+
+    def get_history(self, symbol, start, end=None, interval='1d'):
+        """Return bars for one symbol in [start, end), fetching only what is missing."""
+        return self.get_histories([symbol], start, end, interval).get(symbol, pd.DataFrame())
+
+    def get_histories(self, symbols, start, end=None, interval='1d'):
+        """Return {symbol: bars} for [start, end), with at most two batched upstream calls."""
+        # Skip symbols Yahoo recently reported as unknown
+        symbols = [symbol for symbol in dict.fromkeys(symbols) if not md.is_unknown_symbol(symbol)]
+        start_ts = to_epoch(start)
+        now = time.time()
+
+        backfill, tails = [], {}
+        for symbol in symbols:
+            coverage = self._coverage(symbol, interval)
+            if coverage is None or coverage['last_ts'] is None or coverage['start_ts'] > start_ts:
+                # Never seen, or the request reaches further back than what we hold
+                backfill.append(symbol)
+            elif now - coverage['checked_at'] >= self.min_refresh_seconds:
+                # Re-fetch from the bar before the last one: the last may still have
+                # been forming, the one before is settled and shows re-adjustments
+                tails[symbol] = self._settled_ts(symbol, interval, coverage['last_ts'])
+
+        try:
+            if backfill:
+                self._fetch_and_store(backfill, start_ts, interval, extends_coverage=True)
+            if tails:
+                readjusted = self._fetch_and_store(list(tails), min(tails.values()), interval, check_bars=tails)
+                if readjusted:
+                    # Stored bars predate a split or dividend adjustment: reload the whole range
+                    self._fetch_and_store(list(readjusted), min(readjusted.values()), interval, extends_coverage=True)
+        except sqlite3.Error as e:
+            print(f"Price store update failed for {symbols}: {e}")
+
+        frames = {}
+        for symbol in symbols:
+            df = self.read(symbol, start, end, interval)
+            if not df.empty:
+                frames[symbol] = df
+        return frames
+
+    def _settled_ts(self, symbol, interval, last_ts):
+        row = self._connection().execute(
+            'SELECT MAX(ts) FROM bars WHERE symbol = ? AND interval = ? AND ts < ?', (symbol, interval, last_ts)
+        ).fetchone()
+        return row[0] if row[0] is not None else last_ts
+
+    def _is_readjusted(self, conn, symbol, interval, df, ts):
+        """True if the fetched bar at ts differs from the stored one beyond READJUST_TOLERANCE."""
+        stored = conn.execute(
+            'SELECT close, adj_close FROM bars WHERE symbol = ? AND interval = ? AND ts = ?', (symbol, interval, ts)
+        ).fetchone()
+        fetched = df.reindex(columns=['Close', 'Adj Close']).astype(float)[epoch_index(df) == ts]
+        if stored is None or fetched.empty:
+            return False
+        for old, new in zip(stored, fetched.iloc[0]):
+            if old is not None and not pd.isna(new) and abs(new - old) > READJUST_TOLERANCE * abs(old):
+                return True
+        return False
+
+    def _fetch_and_store(self, symbols, start_ts, interval, extends_coverage=False, check_bars=None):
+        """Fetch and store bars from start_ts.
+
+        check_bars maps symbol -> ts of a stored bar to compare with the fetched
+        one. Symbols whose bar was re-adjusted upstream have their bars and
+        coverage dropped instead, and are returned as {symbol: coverage start}.
+        """
+        readjusted = {}
+        if is_intraday(interval):
+            start_ts = max(start_ts, to_epoch(pd.Timestamp.now() - INTRADAY_RETENTION))
+        start = EPOCH + pd.Timedelta(seconds=start_ts)
+
+        fetched = md.download_stock_data_batch(symbols, start=start, end=None, interval=interval)
+        now = time.time()
+
+        conn = self._connection()
+        with conn:
+            for symbol in symbols:
+                df = fetched.get(symbol)
+                coverage = self._coverage(symbol, interval)
+                if df is None or df.empty:
+                    if coverage is not None:
+                        conn.execute(
+                            'UPDATE coverage SET checked_at = ? WHERE symbol = ? AND interval = ?',
+                            (now, symbol, interval)
+                        )
+                    continue
+
+                if check_bars and symbol in check_bars and \
+                        self._is_readjusted(conn, symbol, interval, df, check_bars[symbol]):
+                    print(f"Price history for {symbol} ({interval}) was re-adjusted upstream; reloading")
+                    conn.execute('DELETE FROM bars WHERE symbol = ? AND interval = ?', (symbol, interval))
+                    conn.execute('DELETE FROM coverage WHERE symbol = ? AND interval = ?', (symbol, interval))
+                    readjusted[symbol] = coverage['start_ts']
+                    continue
+
+                last_ts = self._write_bars(conn, symbol, interval, df)
+                if coverage is None:
+                    conn.execute(
+                        'INSERT INTO coverage (symbol, interval, start_ts, last_ts, checked_at) VALUES (?, ?, ?, ?, ?)',
+                        (symbol, interval, start_ts, last_ts, now)
+                    )
+                else:
+                    new_start = min(coverage['start_ts'], start_ts) if extends_coverage else coverage['start_ts']
+                    conn.execute(
+                        'UPDATE coverage SET start_ts = ?, last_ts = ?, checked_at = ? WHERE symbol = ? AND interval = ?',
+                        (new_start, max(last_ts, coverage['last_ts'] or last_ts), now, symbol, interval)
+                    )
+
+            if is_intraday(interval):
+                self._prune_intraday(conn, symbols, interval)
+        return readjusted
+
+    def _write_bars(self, conn, symbol, interval, df):
+        timestamps = epoch_index(df)
+
+        values = df.reindex(columns=PRICE_COLUMNS).astype(float)
+        rows = [
+            (symbol, interval, int(ts), *bar)
+            for ts, bar in zip(timestamps, values.itertuples(index=False, name=None))
+        ]
+        conn.executemany(
+            'INSERT OR REPLACE INTO bars (symbol, interval, ts, open, high, low, close, adj_close, volume) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            rows
+        )
+        return int(timestamps.max())
+
+    def _prune_intraday(self, conn, symbols, interval):
+        cutoff = to_epoch(pd.Timestamp.now() - INTRADAY_RETENTION)
+        for symbol in symbols:
+            conn.execute(
+                'DELETE FROM bars WHERE symbol = ? AND interval = ? AND ts < ?', (symbol, interval, cutoff))
+            conn.execute(
+                'UPDATE coverage SET start_ts = MAX(start_ts, ?) WHERE symbol = ? AND interval = ?',
+                (cutoff, symbol, interval))
+
+    def read(self, symbol, start, end=None, interval='1d'):
+        """Read stored bars for [start, end) without touching the network."""
+        query = ('SELECT ts, open, high, low, close, adj_close, volume FROM bars '
+                 'WHERE symbol = ? AND interval = ? AND ts >= ?')
+        params = [symbol, interval, to_epoch(start)]
+        if end is not None:
+            query += ' AND ts < ?'
+            params.append(to_epoch(end))
+        rows = self._connection().execute(query + ' ORDER BY ts', params).fetchall()
+        if not rows:
+            return pd.DataFrame()
+
+        df = pd.DataFrame(rows, columns=['ts'] + PRICE_COLUMNS)
+        index = pd.to_datetime(df.pop('ts'), unit='s')
+        df.index = pd.DatetimeIndex(index, name='Datetime' if is_intraday(interval) else 'Date')
+        if df['Adj Close'].isna().all():
+            df = df.drop(columns='Adj Close')
+        return df
+
+
+store = PriceStore(os.getenv('PRICE_STORE_PATH', 'price_store.db'))
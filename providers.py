@@ -0,0 +1,320 @@
+import glob
+import json
+import os
+import threading
+import time
+from io import StringIO
+
+import pandas as pd
+import yfinance as yf
+from yfinance import shared as yf_shared
+
+
+STATEMENT_NAMES = ('financials', 'balance_sheet', 'cashflow')
+YAHOO_SEARCH_URL = 'https://query2.finance.yahoo.com/v1/finance/search'
+
+
+class MarketDataProvider:
+    """Backend interface for everything the app asks a market data source for."""
+
+    def history(self, symbols, start=None, end=None, interval='1d', period=None, threads=True):
+        """Return {symbol: OHLCV DataFrame}; symbols without data are left out."""
+        raise NotImplementedError
+
+    def not_found(self, symbol, full_window=False):
+        """True if the last history call failed because the symbol itself is unknown.
+
+        An empty answer for the requested date window (weekend, before the
+        open) is not a miss, unless full_window says the window spanned a
+        year or more of daily bars.
+        """
+        return False
+
+    def info(self, symbol):
+        """Return the raw Ticker.info dict."""
+        raise NotImplementedError
+
+    def news(self, symbol):
+        """Return the news list, or None if the answer was not a valid (possibly empty) list."""
+        raise NotImplementedError
+
+    def recommendations(self, symbol):
+        raise NotImplementedError
+
+    def financials(self, symbol, statement):
+        """Return one of STATEMENT_NAMES as a DataFrame."""
+        raise NotImplementedError
+
+    def search(self, query, limit=3):
+        """Return [(symbol, name)] matching a ticker or company name."""
+        raise NotImplementedError
+
+
+def split_download(data, symbols):
+    """Split a multi-ticker yf.download result into one DataFrame per symbol."""
+    frames = {}
+    if data is None or data.empty:
+        return frames
+
+    if isinstance(data.columns, pd.MultiIndex):
+        # group_by='ticker' puts the symbol on the first column level
+        available = set(data.columns.get_level_values(0))
+        for symbol in symbols:
+            if symbol not in available:
+                continue
+            df = data[symbol].dropna(how='all')
+            if not df.empty:
+                frames[symbol] = df
+    elif len(symbols) == 1:
+        # A single ticker may come back with flat columns
+        df = data.dropna(how='all')
+        if not df.empty:
+            frames[symbols[0]] = df
+
+    return frames
+
+
+class YFinanceProvider(MarketDataProvider):
+    """Live Yahoo Finance data through yfinance, on the given requests session."""
+
+    def __init__(self, session):
+        self.session = session
+
+    def _ticker(self, symbol):
+        return yf.Ticker(symbol, session=self.session)
+
+    def history(self, symbols, start=None, end=None, interval='1d', period=None, threads=True):
+        # ignore_tz drops each ticker's zone before the frames are joined, so
+        # every bar is in its own exchange's wall-clock time. Without it a
+        # multi-ticker intraday batch is converted to UTC, and the same bar
+        # would be stored at two different times
+        kwargs = {'interval': interval, 'group_by': 'ticker', 'threads': threads, 'progress': False,
+                  'session': self.session, 'ignore_tz': True}
+        if period:
+            kwargs['period'] = period
+        else:
+            kwargs['start'] = start
+            kwargs['end'] = end
+        return split_download(yf.download(symbols, **kwargs), symbols)
+
+    def not_found(self, symbol, full_window=False):
+        # yf.download reports per-symbol failures instead of raising. Yahoo's
+        # own answers start with "possibly delisted;"; exception reprs from
+        # network or rate-limit errors do not, and neither do Yahoo status codes
+        error = str(getattr(yf_shared, '_ERRORS', {}).get(symbol.upper(), '')).lower()
+        if not error.startswith('possibly delisted;') or 'status_code' in error:
+            return False
+        if 'no timezone found' in error:
+            return True
+        # "no price data found" is also what a valid symbol gets for an empty date window
+        return full_window and 'no price data found' in error
+
+    def info(self, symbol):
+        return self._ticker(symbol).info or {}
+
+    def news(self, symbol):
+        # Same request as Ticker.news, which turns a throttled or garbled
+        # response into [] and so hides it from an empty answer
+        res = self.session.get(url=YAHOO_SEARCH_URL, params={'q': symbol}, timeout=10)
+        try:
+            news = res.json().get('news') if res.ok else None
+        except ValueError:
+            return None
+        return news if isinstance(news, list) else None
+
+    def recommendations(self, symbol):
+        return self._ticker(symbol).recommendations
+
+    def financials(self, symbol, statement):
+        return getattr(self._ticker(symbol), statement)
+
+    def search(self, query, limit=3):
+        res = self.session.get(url=YAHOO_SEARCH_URL, params={'q': query, 'quotes_count': limit}, timeout=10)
+        quotes = res.json().get('quotes', [])[:limit]
+        return [(quote['symbol'], quote.get('longname') or quote.get('shortname') or quote['symbol'])
+                for quote in quotes]
+
+
+PERIOD_UNITS = {'d': 1, 'wk': 7, 'mo': 30, 'y': 365}
+
+
+def period_to_timedelta(period):
+    """'5d' -> 5 days, '1mo' -> 30 days, '2y' -> 730 days; None for 'max' or unknown."""
+    for unit, days in PERIOD_UNITS.items():
+        if period.endswith(unit) and period[:-len(unit)].isdigit():
+            return pd.Timedelta(days=int(period[:-len(unit)]) * days)
+    return None
+
+
+class FixtureProvider(MarketDataProvider):
+    """Replays recorded responses from disk, with an artificial per-call latency.
+
+    Layout under `root` (as written by RecordingProvider):
+        history/<interval>/<symbol>.csv, info/<symbol>.json, news/<symbol>.json,
+        recommendations/<symbol>.csv, <statement>/<symbol>.json, search.json
+    """
+
+    def __init__(self, root, latency=0.0):
+        self.root = root
+        self.latency = latency
+        self._frames = {}  # Parsed history files, so replay cost is latency, not CSV parsing
+        self._lock = threading.Lock()
+
+    def _path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _read_json(self, *parts, default=None):
+        try:
+            with open(self._path(*parts), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return default
+
+    def _history_frame(self, symbol, interval):
+        key = (symbol, interval)
+        with self._lock:
+            if key in self._frames:
+                return self._frames[key]
+        path = self._path('history', interval, f"{symbol}.csv")
+        df = pd.read_csv(path, index_col=0, parse_dates=True) if os.path.exists(path) else None
+        with self._lock:
+            self._frames[key] = df
+        return df
+
+    def history(self, symbols, start=None, end=None, interval='1d', period=None, threads=True):
+        self._wait()
+        frames = {}
+        for symbol in symbols:
+            df = self._history_frame(symbol, interval)
+            if df is None or df.empty:
+                continue
+            if period:
+                span = period_to_timedelta(period)
+                if span is not None:
+                    df = df[df.index >= df.index[-1] - span]
+            else:
+                if start is not None:
+                    df = df[df.index >= pd.Timestamp(start)]
+                if end is not None:
+                    df = df[df.index < pd.Timestamp(end)]
+            if not df.empty:
+                frames[symbol] = df.copy()
+        return frames
+
+    def not_found(self, symbol, full_window=False):
+        return not glob.glob(self._path('history', '*', f"{glob.escape(symbol)}.csv"))
+
+    def info(self, symbol):
+        self._wait()
+        return self._read_json('info', f"{symbol}.json", default={})
+
+    def news(self, symbol):
+        self._wait()
+        return self._read_json('news', f"{symbol}.json", default=[])
+
+    def recommendations(self, symbol):
+        self._wait()
+        path = self._path('recommendations', f"{symbol}.csv")
+        return pd.read_csv(path) if os.path.exists(path) else pd.DataFrame()
+
+    def financials(self, symbol, statement):
+        self._wait()
+        payload = self._read_json(statement, f"{symbol}.json")
+        return pd.read_json(StringIO(payload), orient='split') if payload else pd.DataFrame()
+
+    def search(self, query, limit=3):
+        self._wait()
+        results = self._read_json('search.json', default={})
+        return [tuple(result) for result in results.get(query.strip().upper(), [])][:limit]
+
+
+class RecordingProvider(MarketDataProvider):
+    """Passes calls through to another provider and writes the answers as fixtures."""
+
+    def __init__(self, inner, root):
+        self.inner = inner
+        self.root = root
+        self._lock = threading.Lock()
+
+    def _path(self, *parts):
+        path = os.path.join(self.root, *parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def _write_json(self, value, *parts):
+        with self._lock, open(self._path(*parts), 'w', encoding='utf-8') as f:
+            json.dump(value, f, default=str)
+
+    def history(self, symbols, start=None, end=None, interval='1d', period=None, threads=True):
+        frames = self.inner.history(symbols, start, end, interval, period, threads)
+        for symbol, df in frames.items():
+            if getattr(df.index, 'tz', None) is not None:
+                df = df.tz_localize(None)  # Keep exchange wall-clock time, like the price store
+            path = self._path('history', interval, f"{symbol}.csv")
+            with self._lock:
+                if os.path.exists(path):
+                    # Merge with earlier recordings so replays cover every range asked for
+                    stored = pd.read_csv(path, index_col=0, parse_dates=True)
+                    df = pd.concat([stored, df])
+                    df = df[~df.index.duplicated(keep='last')].sort_index()
+                df.to_csv(path)
+        return frames
+
+    def not_found(self, symbol, full_window=False):
+        return self.inner.not_found(symbol, full_window)
+
+    def info(self, symbol):
+        info = self.inner.info(symbol)
+        self._write_json(info, 'info', f"{symbol}.json")
+        return info
+
+    def news(self, symbol):
+        news = self.inner.news(symbol)
+        if news is not None:
+            self._write_json(news, 'news', f"{symbol}.json")
+        return news
+
+    def recommendations(self, symbol):
+        rec = self.inner.recommendations(symbol)
+        if rec is not None:
+            with self._lock:
+                rec.to_csv(self._path('recommendations', f"{symbol}.csv"), index=False)
+        return rec
+
+    def financials(self, symbol, statement):
+        df = self.inner.financials(symbol, statement)
+        if df is not None and not df.empty:
+            self._write_json(df.to_json(orient='split', date_format='iso'), statement, f"{symbol}.json")
+        return df
+
+    def search(self, query, limit=3):
+        results = self.inner.search(query, limit)
+        path = self._path('search.json')
+        with self._lock:
+            try:
+                with open(path, encoding='utf-8') as f:
+                    recorded = json.load(f)
+            except FileNotFoundError:
+                recorded = {}
+            recorded[query.strip().upper()] = results
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(recorded, f)
+        return results
+
+
+def create_provider(session):
+    """Pick the backend from MARKET_DATA_PROVIDER: yfinance (default), fixtures or record."""
+    backend = os.getenv('MARKET_DATA_PROVIDER', 'yfinance')
+    fixtures = os.getenv('MARKET_DATA_FIXTURES', 'fixtures')
+    if backend == 'fixtures':
+        latency = float(os.getenv('MARKET_DATA_LATENCY_MS', 0)) / 1000
+        print(f"Replaying market data fixtures from {fixtures} ({latency * 1000:.0f} ms per call)")
+        return FixtureProvider(fixtures, latency)
+    if backend == 'record':
+        print(f"Recording market data fixtures to {fixtures}")
+        return RecordingProvider(YFinanceProvider(session), fixtures)
+    return YFinanceProvider(session)
@@ -0,0 +1,170 @@
+import json
+import threading
+import time
+
+from apscheduler.schedulers.background import BackgroundScheduler
+
+import market_data as md
+import market_hours as mh
+from models import Watchlist
+from rate_limiter import priority
+
+
+# Shared-cache keys; every worker reads them, one worker per cycle refreshes them
+SNAPSHOT_KEY = 'quote-snapshot:quotes'
+ACTIVE_KEY = 'quote-snapshot:active'
+REFRESH_LOCK_KEY = 'quote-snapshot:refreshing'
+# Quotes from the last close must survive a long weekend
+SNAPSHOT_SECONDS = 7 * 24 * 3600
+
+
+class QuoteSnapshot:
+    """Latest quote for every watched symbol, refreshed in the background.
+
+    The universe is the union of all saved watchlists and the symbols active
+    sessions have asked for recently. Every worker runs the same tick, but
+    only the worker that wins the shared-cache lock for that cycle downloads
+    quotes, and only while prices can still move; the snapshot it publishes
+    in the shared cache is copied into each worker's memory. Views read
+    quotes from memory; only symbols the snapshot has never seen are fetched
+    on demand.
+    """
+
+    def __init__(self, refresh_seconds=60, session_ttl=1800):
+        self.refresh_seconds = refresh_seconds
+        self.session_ttl = session_ttl  # How long a session-requested symbol stays watched
+        self._lock = threading.Lock()
+        self._quotes = {}
+        self._active = {}
+        self._scheduler = None
+        self._server = None
+        self._cache = None
+
+    def track(self, symbols):
+        now = time.time()
+        with self._lock:
+            for symbol in symbols:
+                self._active[symbol] = now
+
+    def get_quotes(self, symbols):
+        """Return {symbol: (previous_close, latest_close, change_percent)} from the snapshot."""
+        symbols = list(dict.fromkeys(symbols))
+        self.track(symbols)
+
+        missing = self._missing(symbols)
+        if missing and self._cache is not None:
+            # Another worker may already have published them
+            try:
+                self._sync()
+            except Exception as e:
+                print(f"Reading quote snapshot failed: {e}")
+            missing = self._missing(symbols)
+        if missing:
+            self._update(missing)
+
+        with self._lock:
+            return {
+                symbol: self._quotes.get(symbol, {}).get('quote', (None, None, None))
+                for symbol in symbols
+            }
+
+    def _missing(self, symbols):
+        with self._lock:
+            return [symbol for symbol in symbols if symbol not in self._quotes]
+
+    def _update(self, symbols, watched=None):
+        """Download quotes for symbols and merge them into the shared snapshot.
+
+        When watched is given, symbols no longer watched are dropped from it.
+        """
+        symbols = [symbol for symbol in symbols if not md.is_unknown_symbol(symbol)]
+        if not symbols:
+            return
+        history = md.single_flight.do(
+            ('watchlist_quotes', tuple(symbols)),
+            md.download_stock_data_batch, symbols, period='5d'
+        )
+        now = time.time()
+        updates = {}
+        with self._lock:
+            for symbol in symbols:
+                quote = md.summarize_daily_change(history.get(symbol))
+                if quote[0] is not None or symbol not in self._quotes:
+                    updates[symbol] = {'quote': quote, 'updated_at': now}
+            self._quotes.update(updates)
+
+        if self._cache is None:
+            return
+        try:
+            snapshot = self._cache.get(SNAPSHOT_KEY) or {}
+            if watched is not None:
+                snapshot = {symbol: entry for symbol, entry in snapshot.items() if symbol in watched}
+            snapshot.update(updates)
+            self._cache.set(SNAPSHOT_KEY, snapshot, timeout=SNAPSHOT_SECONDS)
+        except Exception as e:
+            print(f"Publishing quote snapshot failed: {e}")
+
+    def _sync(self):
+        """Copy the shared snapshot into this worker's memory."""
+        snapshot = self._cache.get(SNAPSHOT_KEY)
+        if snapshot:
+            with self._lock:
+                self._quotes.update(snapshot)
+
+    def _share_active(self):
+        """Merge this worker's session symbols into the shared set; return the merged set."""
+        cutoff = time.time() - self.session_ttl
+        with self._lock:
+            for symbol, last_seen in list(self._active.items()):
+                if last_seen < cutoff:
+                    del self._active[symbol]
+            local = dict(self._active)
+
+        active = {symbol: last_seen for symbol, last_seen in (self._cache.get(ACTIVE_KEY) or {}).items()
+                  if last_seen >= cutoff}
+        for symbol, last_seen in local.items():
+            active[symbol] = max(last_seen, active.get(symbol, 0))
+        self._cache.set(ACTIVE_KEY, active, timeout=self.session_ttl)
+        return active
+
+    def watched_symbols(self, active=()):
+        symbols = set(active)
+        if self._server is not None:
+            with self._server.app_context():
+                for (stocks,) in Watchlist.query.with_entities(Watchlist.stocks).all():
+                    try:
+                        symbols.update(json.loads(stocks))
+                    except (TypeError, ValueError):
+                        continue
+        return sorted(symbols)
+
+    def refresh(self):
+        try:
+            active = self._share_active()
+            # The lock expires before the next tick, so some worker refreshes each cycle
+            if self._cache.add(REFRESH_LOCK_KEY, 1, timeout=max(self.refresh_seconds - 5, 1)):
+                symbols = self.watched_symbols(active)
+                # NYSE quotes only change from the open until the close has settled;
+                # symbols on other calendars have no modelled hours and always refresh
+                due = symbols if mh.prices_moving() else [symbol for symbol in symbols if not mh.follows_nyse(symbol)]
+                if due:
+                    with priority('prefetch'):
+                        self._update(due, watched=set(symbols))
+                    return
+            self._sync()
+        except Exception as e:
+            print(f"Quote snapshot refresh failed: {e}")
+
+    def start(self, server, cache):
+        """Start the periodic refresh job (once per process); cache is the shared Flask-Caching backend."""
+        if self._scheduler is not None:
+            return
+        self._server = server
+        self._cache = cache
+        self._scheduler = BackgroundScheduler(daemon=True)
+        self._scheduler.add_job(self.refresh, trigger='interval', seconds=self.refresh_seconds,
+                                max_instances=1, coalesce=True)
+        self._scheduler.start()
+
+
+snapshot = QuoteSnapshot()
@@ -0,0 +1,139 @@
+import contextlib
+import contextvars
+import os
+import sqlite3
+import threading
+import time
+
+
+# Highest priority first:
+#   interactive - request-path calls a user is waiting on (charts, ticker search)
+#   premium     - heavier on-demand premium features (forecasts, financials, simulation)
+#   prefetch    - cache warming: preload, quote snapshot, refresh-ahead
+#   batch       - the weekly KPI crawl in background_tasks.py
+PRIORITIES = ('interactive', 'premium', 'prefetch', 'batch')
+
+# Share of the bucket a class must leave untouched for the classes above it,
+# so background work only spends tokens the foreground is not using
+RESERVES = {'interactive': 0.0, 'premium': 0.1, 'prefetch': 0.4, 'batch': 0.6}
+
+_priority = contextvars.ContextVar('upstream_priority', default=None)
+_default_priority = 'interactive'
+
+
+def set_default_priority(name):
+    """Set the priority for threads that never entered a priority() block."""
+    global _default_priority
+    if name not in RESERVES:
+        raise ValueError(f"Unknown priority class: {name}")
+    _default_priority = name
+
+
+def current_priority():
+    return _priority.get() or _default_priority
+
+
+@contextlib.contextmanager
+def priority(name):
+    """Run upstream calls made in this block (and this thread) under a priority class."""
+    if name not in RESERVES:
+        raise ValueError(f"Unknown priority class: {name}")
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    """Token bucket shared by every process on the host through SQLite.
+
+    Gunicorn workers and the background crawl draw from the same bucket, so the
+    combined request rate to Yahoo stays under `rate` per second with bursts of
+    up to `capacity`. A class may only take a token while the bucket holds more
+    than its reserve.
+    """
+
+    def __init__(self, path, rate, capacity, name='yahoo'):
+        self.path = path
+        self.rate = rate
+        self.capacity = capacity
+        self.name = name
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._stats = {cls: {'acquired': 0, 'waited': 0, 'wait_seconds': 0.0} for cls in PRIORITIES}
+        conn = self._connection()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS rate_limit (
+                name TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Autocommit mode, so BEGIN IMMEDIATE below controls the transaction
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def _try_acquire(self, priority):
+        """Take a token if the class may; otherwise return seconds to wait."""
+        reserve = RESERVES[priority] * self.capacity
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated_at FROM rate_limit WHERE name = ?', (self.name,)).fetchone()
+            now = time.time()
+            tokens = self.capacity if row is None else min(self.capacity, row[0] + (now - row[1]) * self.rate)
+            if tokens - 1 >= reserve:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (reserve + 1 - tokens) / self.rate
+            conn.execute('INSERT OR REPLACE INTO rate_limit (name, tokens, updated_at) VALUES (?, ?, ?)',
+                         (self.name, tokens, now))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return wait
+
+    def acquire(self, priority=None):
+        """Block until the current priority class may make one upstream request."""
+        priority = priority or current_priority()
+        started = time.perf_counter()
+        waited = False
+        while True:
+            try:
+                wait = self._try_acquire(priority)
+            except sqlite3.Error as e:
+                # Never block traffic on the limiter's own storage
+                print(f"Rate limiter unavailable, proceeding: {e}")
+                wait = 0.0
+            if wait <= 0:
+                break
+            waited = True
+            # Re-check often: higher classes may drain the bucket meanwhile
+            time.sleep(min(wait, 0.5))
+
+        with self._stats_lock:
+            stats = self._stats[priority]
+            stats['acquired'] += 1
+            if waited:
+                stats['waited'] += 1
+                stats['wait_seconds'] += time.perf_counter() - started
+
+    def stats(self):
+        with self._stats_lock:
+            return {cls: dict(values) for cls, values in self._stats.items()}
+
+
+limiter = TokenBucket(
+    os.getenv('PRICE_STORE_PATH', 'price_store.db'),
+    rate=float(os.getenv('YAHOO_RATE_PER_SECOND', 5)),
+    capacity=float(os.getenv('YAHOO_RATE_BURST', 30)),
+)
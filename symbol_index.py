@@ -0,0 +1,220 @@
+import bisect
+import csv
+import difflib
+import heapq
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import requests
+from apscheduler.schedulers.background import BackgroundScheduler
+
+
+BUNDLED_SYMBOLS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'symbols.csv')
+# Every US-listed security with its name, published daily by Nasdaq (not a Yahoo endpoint)
+SYMBOL_DIRECTORY_URL = 'https://www.nasdaqtrader.com/dynamic/symdir/nasdaqtraded.txt'
+
+# Words that appear in most company names and would match everything
+NAME_STOPWORDS = {
+    'INC', 'CORP', 'CORPORATION', 'CO', 'COMPANY', 'LTD', 'LIMITED', 'PLC', 'THE', 'AND',
+    'CLASS', 'COMMON', 'STOCK', 'SHARES', 'ORDINARY', 'SA', 'NV', 'AG', 'SE', 'LP',
+}
+
+
+def tokenize(text):
+    return [token for token in re.split(r'[^A-Z0-9]+', text.upper()) if token and token not in NAME_STOPWORDS]
+
+
+class SymbolIndex:
+    """In-memory ticker and company name index for autocomplete.
+
+    Seeded from the bundled static/symbols.csv, replaced by the full Nasdaq
+    symbol directory once a day (shared by workers through SQLite), and
+    extended with whatever the Yahoo search fallback returns.
+    """
+
+    def __init__(self, path, refresh_seconds=24 * 3600):
+        self.path = path
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._scheduler = None
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS symbols (
+                    symbol TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+        self._build(self._load_bundled() + self._load_stored())
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def _load_bundled(self):
+        try:
+            with open(BUNDLED_SYMBOLS, newline='', encoding='utf-8') as f:
+                return [(row['symbol'], row['name']) for row in csv.DictReader(f)]
+        except OSError as e:
+            print(f"Bundled symbol list not available: {e}")
+            return []
+
+    def _load_stored(self):
+        try:
+            return self._connection().execute('SELECT symbol, name FROM symbols ORDER BY rowid').fetchall()
+        except sqlite3.Error as e:
+            print(f"Stored symbol list not available: {e}")
+            return []
+
+    def _build(self, entries):
+        # Earlier entries win and rank higher: the bundled list is ordered by popularity
+        names, rank = {}, {}
+        for symbol, name in entries:
+            symbol = symbol.upper()
+            if symbol not in names:
+                rank[symbol] = len(rank)
+                names[symbol] = name
+
+        tokens = defaultdict(set)
+        for symbol, name in names.items():
+            for token in tokenize(name):
+                tokens[token].add(symbol)
+
+        # Fuzzy candidates are limited to words with the same first letter
+        buckets = defaultdict(list)
+        for key in list(names) + list(tokens):
+            buckets[key[0]].append(key)
+
+        with self._lock:
+            self._names = names
+            self._rank = rank
+            self._sorted_symbols = sorted(names)
+            self._tokens = dict(tokens)
+            self._sorted_tokens = sorted(tokens)
+            self._buckets = dict(buckets)
+            self._results = {}  # Memoized answers, invalidated by every rebuild
+
+    def __len__(self):
+        return len(self._names)
+
+    def _prefixed(self, sorted_keys, prefix):
+        start = bisect.bisect_left(sorted_keys, prefix)
+        end = bisect.bisect_left(sorted_keys, prefix + '\uffff')
+        return sorted_keys[start:end]
+
+    def search(self, query, limit=5):
+        """Return [(symbol, name)] for a ticker or company name query, best matches first."""
+        query = query.strip().upper()
+        if not query:
+            return []
+        results = self._results.get((query, limit))
+        if results is None:
+            results = self._search(query, limit)
+            if len(self._results) > 10000:
+                self._results.clear()
+            self._results[(query, limit)] = results
+        return results
+
+    def _search(self, query, limit):
+        names, rank = self._names, self._rank
+        top = lambda symbols: heapq.nsmallest(limit, symbols, key=lambda s: (rank.get(s, len(rank)), s))
+
+        # 1. Exact ticker, then tickers starting with the query
+        matches = [query] if query in names else []
+        matches += top(s for s in self._prefixed(self._sorted_symbols, query) if s != query)
+
+        # 2. Company names where every query word starts a word of the name
+        # (single letters would match half the index)
+        words = tokenize(query)
+        if words and len(matches) < limit and len(query) > 1:
+            candidates = None
+            for word in words:
+                hits = set()
+                for token in self._prefixed(self._sorted_tokens, word):
+                    hits |= self._tokens[token]
+                candidates = hits if candidates is None else candidates & hits
+            matches += top(candidates - set(matches))
+
+        # 3. Fuzzy match on tickers and name words for typos
+        if not matches and len(query) >= 3:
+            word = words[-1] if words else query
+            nearby = [key for key in self._buckets.get(word[0], ()) if abs(len(key) - len(word)) <= 2]
+            close = []
+            for key in difflib.get_close_matches(word, nearby, n=limit, cutoff=0.75):
+                close += [key] if key in names else top(self._tokens[key])
+            matches = list(dict.fromkeys(close))
+
+        return [(symbol, names[symbol]) for symbol in matches[:limit]]
+
+    def add(self, entries, source='yahoo'):
+        """Add (symbol, name) pairs, e.g. from a Yahoo search fallback."""
+        entries = [(symbol.upper(), name) for symbol, name in entries if symbol and name]
+        if not entries:
+            return
+        now = time.time()
+        try:
+            with self._connection() as conn:
+                conn.executemany(
+                    'INSERT OR IGNORE INTO symbols (symbol, name, source, updated_at) VALUES (?, ?, ?, ?)',
+                    [(symbol, name, source, now) for symbol, name in entries]
+                )
+        except sqlite3.Error as e:
+            print(f"Symbol index write failed: {e}")
+        self._build(list(self._names.items()) + entries)
+
+    def _download_directory(self):
+        response = requests.get(SYMBOL_DIRECTORY_URL, timeout=30)
+        response.raise_for_status()
+        entries = []
+        for row in csv.DictReader(response.text.splitlines(), delimiter='|'):
+            symbol = (row.get('Symbol') or '').strip()
+            name = (row.get('Security Name') or '').strip()
+            # Skip test issues, the trailer line and preferreds/warrants Yahoo does not list
+            if not symbol or not name or row.get('Test Issue') != 'N' or '$' in symbol:
+                continue
+            # "Apple Inc. - Common Stock" -> "Apple Inc."; BRK.B is BRK-B on Yahoo
+            entries.append((symbol.replace('.', '-'), name.split(' - ')[0]))
+        return entries
+
+    def refresh(self):
+        """Reload the full symbol directory if no worker has done so within refresh_seconds."""
+        try:
+            row = self._connection().execute(
+                "SELECT MAX(updated_at) FROM symbols WHERE source = 'directory'"
+            ).fetchone()
+            if row[0] is None or time.time() - row[0] >= self.refresh_seconds:
+                entries = self._download_directory()
+                now = time.time()
+                with self._connection() as conn:
+                    conn.execute("DELETE FROM symbols WHERE source = 'directory'")
+                    conn.executemany(
+                        'INSERT OR REPLACE INTO symbols (symbol, name, source, updated_at) VALUES (?, ?, ?, ?)',
+                        [(symbol, name, 'directory', now) for symbol, name in entries]
+                    )
+            self._build(self._load_bundled() + self._load_stored())
+        except Exception as e:
+            print(f"Symbol index refresh failed: {e}")
+
+    def start(self):
+        """Refresh now and then periodically in the background (once per process)."""
+        if self._scheduler is not None:
+            return
+        self._scheduler = BackgroundScheduler(daemon=True)
+        # Checks hourly; only one worker per refresh_seconds actually downloads
+        self._scheduler.add_job(self.refresh, trigger='interval', seconds=min(self.refresh_seconds, 3600),
+                                next_run_time=datetime.now(), max_instances=1, coalesce=True)
+        self._scheduler.start()
+
+
+symbol_index = SymbolIndex(os.getenv('PRICE_STORE_PATH', 'price_store.db'))
@@ -1,14 +1,12 @@
 from datetime import datetime, timedelta
 import plotly.graph_objs as go
 import dash_bootstrap_components as dbc
-import yfinance as yf
 from dash import html
 from datetime import datetime
 import pandas as pd
 import plotly.graph_objects as go
 from dash import dash_table
 import re
-import requests
 from prophet import Prophet
 from flask_mail import Message
 from itsdangerous import URLSafeTimedSerializer
@@ -21,6 +19,13 @@ import os
 import logging
 from plotly.subplots import make_subplots
 import plotly.express as px
+import plotly.io as pio
+from functools import lru_cache
+from price_store import store as price_store
+from downsample import downsample_series, aggregate_ohlc, aggregate_volume, POINTS_PER_CANDLE
+from indicators import is_overlay, output_columns
+import market_data as md
+from quote_snapshot import snapshot as quote_snapshot
 
 
 logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
@@ -119,8 +124,10 @@ def fetch_news(symbols, max_articles=4):
     news_content = []
 
     for symbol in symbols:
-        ticker = yf.Ticker(symbol)
-        news = ticker.news  # Fetch news using yfinance
+        if md.is_unknown_symbol(symbol):
+            news_content.append(html.P(unknown_symbols_note([symbol]), className="mt-4"))
+            continue
+        news = md.get_ticker_news(symbol)  # Fetch news using yfinance
 
         if news:
             news_content.append(
@@ -177,25 +184,76 @@ def fetch_news(symbols, max_articles=4):
 
 
 def fetch_analyst_recommendations(symbol):
-    ticker = yf.Ticker(symbol)
-    rec = ticker.recommendations
+    if md.is_unknown_symbol(symbol) or md.is_known_missing(symbol, 'recommendations'):
+        return pd.DataFrame()
+    rec = md.get_recommendations(symbol)
     if rec is not None and not rec.empty:
         return rec.tail(10)  # Fetch the latest 10 recommendations
+    md.remember_missing(symbol, 'recommendations')
     return pd.DataFrame()  # Return an empty DataFrame if no data
 
 
+def stale_data_note(as_of=None):
+    """Text shown next to data served from storage while the market data upstream is failing."""
+    if not md.breaker.degraded:
+        return None
+    note = "Live market data is temporarily unavailable; showing saved data"
+    if as_of is not None:
+        note += f" as of {pd.Timestamp(as_of):%Y-%m-%d %H:%M}"
+    return note + "."
+
+
+def mark_figure_stale(fig, as_of=None):
+    """Annotate a figure built from stored data while the upstream circuit is open."""
+    note = stale_data_note(as_of)
+    if note:
+        fig.add_annotation(
+            text=note, xref='paper', yref='paper', x=1, y=1, xanchor='right', yanchor='bottom',
+            showarrow=False, font=dict(size=10, color='orange')
+        )
+    return fig
+
+
+def unknown_symbols_note(symbols):
+    """Message for symbols Yahoo has no price history for, or None if all are known."""
+    unknown = [symbol for symbol in symbols if md.is_unknown_symbol(symbol)]
+    if not unknown:
+        return None
+    label = "Unknown symbol" if len(unknown) == 1 else "Unknown symbols"
+    return f"{label}: {', '.join(unknown)} (mistyped or delisted, no market data)"
+
+
+def mark_unknown_symbols(fig, symbols):
+    """Annotate a figure with the selected symbols that have no market data."""
+    note = unknown_symbols_note(symbols)
+    if note:
+        fig.add_annotation(
+            text=note, xref='paper', yref='paper', x=0, y=1, xanchor='left', yanchor='bottom',
+            showarrow=False, font=dict(size=10, color='red')
+        )
+    return fig
+
+
+@lru_cache(maxsize=None)
+def plotly_template(name):
+    """Full definition of a named Plotly template, as assigned to layout.template in the browser."""
+    return pio.templates[name].to_plotly_json()
+
+
 def get_stock_performance(symbols):
     performance_data = {}
+    quotes = quote_snapshot.get_quotes(symbols)
+    one_year_ago = pd.to_datetime('today').normalize() - timedelta(days=365)
     for symbol in symbols:
-        ticker = yf.Ticker(symbol)
-        # Fetch historical data
-        hist = ticker.history(period="1y")
+        # Historical data comes from the local price store
+        hist = price_store.get_history(symbol, one_year_ago)
         # Fetch basic stock info
-        info = ticker.info
+        info = md.get_ticker_info(symbol)
+        _, latest_close, _ = quotes[symbol]
 
         # Fetch performance-related data
         performance_data[symbol] = {
-            "latest_close": hist['Close'].iloc[-1] if not hist.empty else None,
+            "latest_close": latest_close,
             "one_year_return": (hist['Close'].iloc[-1] / hist['Close'].iloc[0] - 1) * 100 if not hist.empty else None,
             "52_week_high": info.get("fiftyTwoWeekHigh"),
             "52_week_low": info.get("fiftyTwoWeekLow"),
@@ -395,28 +453,11 @@ def validate_password(password):
     return None
 
 
-def fetch_stock_data_watchlist(symbol):
-    """Fetch latest stock data for a given symbol."""
-    try:
-        stock = yf.Ticker(symbol)
-        hist = stock.history(period="5d")
-        if len(hist) < 2:
-            return None, None, None
-        latest_close = hist['Close'].iloc[-1]
-        previous_close = hist['Close'].iloc[-2]
-        change_percent = ((latest_close - previous_close) /
-                          previous_close) * 100
-        return previous_close, latest_close, change_percent
-    except Exception as e:
-        print(f"Error fetching data for {symbol}: {e}")
-        return None, None, None
-
-
 def generate_watchlist_table(watchlist):
     rows = []
+    quotes = quote_snapshot.get_quotes(watchlist)
     for i, stock in enumerate(watchlist):
-        prev_close, latest_close, change_percent = fetch_stock_data_watchlist(
-            stock)
+        prev_close, latest_close, change_percent = quotes[stock]
         if prev_close is not None:
             # Determine the color based on the change percentage
             color = 'green' if change_percent > 0 else 'red' if change_percent < 0 else 'black'
@@ -464,33 +505,34 @@ def generate_watchlist_table(watchlist):
 
 
 def get_ticker(company_name):
-    yfinance = "https://query2.finance.yahoo.com/v1/finance/search"
-    user_agent = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36'
-    params = {"q": company_name, "quotes_count": 3}
-
-    res = requests.get(url=yfinance, params=params,
-                       headers={'User-Agent': user_agent})
-    data = res.json()
+    # Up to three (symbol, company name) matches from the market data provider
+    return md.search_symbols(company_name, limit=3)
 
-    # Extract multiple ticker symbols, if available
-    company_codes = [quote['symbol'] for quote in data['quotes'][:3]]
 
-    return company_codes
+def load_forecast_histories(selected_stocks):
+    """The 5 years of daily bars per symbol that generate_forecast_data fits on, from the local store."""
+    five_years_ago = pd.to_datetime('today').normalize() - pd.DateOffset(years=5)
+    try:
+        return price_store.get_histories(selected_stocks, five_years_ago)
+    except Exception as e:
+        print(f"Error loading forecast history for {selected_stocks}: {e}")
+        return {}
 
 
-def generate_forecast_data(selected_stocks, horizon):
+def generate_forecast_data(selected_stocks, horizon, histories):
     """
     Generate forecast data using Prophet for selected stocks and return the forecast results,
     including KPIs for expected price, actual latest price, and percentage difference.
+    histories comes from load_forecast_histories.
     """
     forecast_data = {}
     for symbol in selected_stocks:
         try:
-            df = yf.download(symbol, period='5y')  # Fetch 5 years of data
-            if df.empty:
+            df = histories.get(symbol)
+            if df is None or df.empty:
                 raise ValueError(f"No data found for {symbol}")
 
-            df.reset_index(inplace=True)
+            df = df.reset_index()
             # Prepare data for Prophet
             df_prophet = df[['Date', 'Close']].rename(
                 columns={'Date': 'ds', 'Close': 'y'})
@@ -753,54 +795,81 @@ def combine_forecast_figures(forecast_figures, plotly_theme):
     return combined_fig
 
 
-def generate_fig_stock(df_all, selected_prices_stocks, movag_input, chart_type, plotly_theme, interval):
+OVERLAY_COLORS = ['green', 'red', 'purple', 'orange', 'teal', 'brown']
+# Height of an RSI / MACD / ATR panel under a price row, in pixels
+PANEL_HEIGHT = 150
+
+
+def generate_fig_stock(stock_frames, selected_prices_stocks, movag_input, chart_type, plotly_theme, interval,
+                       max_points=None, indicators=()):
+    """Build the prices subplots; max_points caps the points per line trace (LTTB) and, a
+    quarter of it, the candles and volume bars per subplot (merged consecutive bars).
+
+    Overlay indicators (SMA, EMA, Bollinger) are drawn on the price row; RSI, MACD
+    and ATR each get a short panel below it.
+    """
+    overlays = [spec for spec in indicators if is_overlay(spec)]
+    panels = [spec for spec in indicators if not is_overlay(spec)]
+    rows_per_stock = 1 + len(panels)
     num_stocks = len(selected_prices_stocks)
-    graph_height = max((400 + 20) * num_stocks, 400)
+    num_rows = num_stocks * rows_per_stock
+    graph_height = max((400 + 20) * num_stocks + PANEL_HEIGHT * len(panels) * num_stocks, 400)
 
+    subplot_titles = []
+    for symbol in selected_prices_stocks:
+        subplot_titles += [symbol] + [f"{symbol} {spec.replace('_', ' ')}" for spec in panels]
     fig_stock = make_subplots(
-        rows=num_stocks,
+        rows=num_rows,
         cols=1,
         shared_xaxes=True,
-        vertical_spacing=0.05,
-        subplot_titles=selected_prices_stocks,
-        specs=[[{"secondary_y": True}] for _ in range(num_stocks)]
+        # make_subplots rejects spacing above 1 / (rows - 1)
+        vertical_spacing=min(0.05, 1 / (2 * num_rows)),
+        subplot_titles=subplot_titles,
+        row_heights=([400] + [PANEL_HEIGHT] * len(panels)) * num_stocks,
+        specs=([[{"secondary_y": True}]] + [[{"secondary_y": False}]] * len(panels)) * num_stocks
     )
 
     for i, symbol in enumerate(selected_prices_stocks):
-        df_stock = df_all[df_all['Stock'] == symbol]
-
-        # Ensure the index is datetime format
-        if not pd.api.types.is_datetime64_any_dtype(df_stock.index):
-            df_stock.index = pd.to_datetime(df_stock.index)
+        row = i * rows_per_stock + 1
+        df_stock = stock_frames.get(symbol)
+        if df_stock is None:
+            continue
 
         if not df_stock.empty:
+            # Only send as many points as the chart width can show
+            line_points = max_points or len(df_stock)
+            bar_points = max(max_points // POINTS_PER_CANDLE, 1) if max_points else len(df_stock)
+            candles = aggregate_ohlc(df_stock, bar_points) if chart_type == 'candlestick' else None
+
             # Add Volume trace if 'Volume' is in movag_input
             if 'Volume' in movag_input:
+                volume = candles['Volume'] if candles is not None else aggregate_volume(df_stock['Volume'], bar_points)
                 fig_stock.add_trace(
                     go.Bar(
-                        x=df_stock.index,
-                        y=df_stock['Volume'],
+                        x=volume.index,
+                        y=volume,
                         name=f'{symbol} Volume',
                         marker=dict(color='darkgray'),
                         opacity=0.6
                     ),
-                    row=i + 1,
+                    row=row,
                     col=1,
                     secondary_y=True
                 )
                 fig_stock.update_yaxes(
-                    showgrid=False, secondary_y=True, row=i + 1, col=1)
+                    showgrid=False, secondary_y=True, row=row, col=1)
 
             # Add the main trace based on the chart type
             if chart_type == 'line':
+                close = downsample_series(df_stock['Close'], line_points)
                 fig_stock.add_trace(
                     go.Scatter(
-                        x=df_stock.index,
-                        y=df_stock['Close'],
+                        x=close.index,
+                        y=close,
                         name=f'{symbol} Close',
                         line=dict(color='steelblue', width=3)
                     ),
-                    row=i + 1,
+                    row=row,
                     col=1
                 )
                 last_close = df_stock['Close'].iloc[-2]
@@ -814,7 +883,7 @@ def generate_fig_stock(df_all, selected_prices_stocks, movag_input, chart_type,
                     mode='markers',
                     marker=dict(color='red', size=10),
                     name=f'{symbol} Last Price'
-                ), row=i + 1, col=1)
+                ), row=row, col=1)
 
                 latest_timestamp = df_stock.index[-1]
                 fig_stock.add_annotation(
@@ -825,7 +894,7 @@ def generate_fig_stock(df_all, selected_prices_stocks, movag_input, chart_type,
                     arrowhead=None,
                     ax=20,
                     ay=-40,
-                    row=i + 1,
+                    row=row,
                     col=1,
                     font=dict(color="blue", size=12),
                     bgcolor='white'
@@ -842,47 +911,59 @@ def generate_fig_stock(df_all, selected_prices_stocks, movag_input, chart_type,
                         width=2,
                         dash="dot"
                     ),
-                    row=i + 1, col=1
+                    row=row, col=1
                 )
             elif chart_type == 'candlestick':
                 fig_stock.add_trace(
                     go.Candlestick(
-                        x=df_stock.index,
-                        open=df_stock['Open'],
-                        high=df_stock['High'],
-                        low=df_stock['Low'],
-                        close=df_stock['Close'],
+                        x=candles.index,
+                        open=candles['Open'],
+                        high=candles['High'],
+                        low=candles['Low'],
+                        close=candles['Close'],
                         name=f'{symbol} Candlestick'
                     ),
-                    row=i + 1,
+                    row=row,
                     col=1
                 )
                 fig_stock.update_xaxes(
-                    rangeslider={'visible': False}, row=i + 1, col=1)
-
-            # Add moving averages if present and selected
-            if '30D_MA' in movag_input and '30D_MA' in df_stock.columns:
-                fig_stock.add_trace(
-                    go.Scatter(
-                        x=df_stock.index,
-                        y=df_stock['30D_MA'],
-                        name=f'{symbol} 30D MA',
-                        line=dict(color='green')
-                    ),
-                    row=i + 1,
-                    col=1
-                )
-            if '100D_MA' in movag_input and '100D_MA' in df_stock.columns:
-                fig_stock.add_trace(
-                    go.Scatter(
-                        x=df_stock.index,
-                        y=df_stock['100D_MA'],
-                        name=f'{symbol} 100D MA',
-                        line=dict(color='red')
-                    ),
-                    row=i + 1,
-                    col=1
-                )
+                    rangeslider={'visible': False}, row=row, col=1)
+
+            # Indicator columns were joined onto the frame by the callback
+            for n, spec in enumerate(overlays):
+                for column in output_columns(spec):
+                    if column not in df_stock.columns:
+                        continue
+                    values = downsample_series(df_stock[column], line_points)
+                    band = spec.startswith('BB_') and not column.endswith('_mid')
+                    fig_stock.add_trace(
+                        go.Scatter(
+                            x=values.index,
+                            y=values,
+                            name=f"{symbol} {column.replace('_', ' ')}",
+                            line=dict(color=OVERLAY_COLORS[n % len(OVERLAY_COLORS)], width=1 if band else 2,
+                                      dash='dot' if band else None)
+                        ),
+                        row=row,
+                        col=1
+                    )
+
+            for n, spec in enumerate(panels):
+                panel_row = row + 1 + n
+                for column in output_columns(spec):
+                    if column not in df_stock.columns:
+                        continue
+                    values = downsample_series(df_stock[column], line_points)
+                    trace = go.Bar if column.endswith('_hist') else go.Scatter
+                    fig_stock.add_trace(
+                        trace(x=values.index, y=values, name=f"{symbol} {column.replace('_', ' ')}"),
+                        row=panel_row,
+                        col=1
+                    )
+                if spec.startswith('RSI_'):
+                    # Conventional overbought / oversold levels
+                    for level in (30, 70):
+                        fig_stock.add_hline(y=level, line=dict(color='gray', width=1, dash='dot'), row=panel_row, col=1)
 
     # Update layout and x-axis format based on the interval
     fig_stock.update_layout(